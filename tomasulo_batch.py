@@ -0,0 +1,598 @@
+import numpy as np
+
+from tomasulo_sim import DEFAULT_LATENCIES, DEFAULT_PROGRAM_FILE, UNIT_CLASSES, UNIT_OF_OPCODE, parse_program
+from tomasulo_state import SimulatorMemory, load_state
+
+# Simulacao em lote: K configuracoes do TomasuloSimulator avancando em lockstep
+# sobre o mesmo programa. Todo o estado (ROB, RS, registradores, memoria) vive
+# em arrays NumPy com uma linha (ou coluna) por configuracao, e cada estagio do
+# pipeline e aplicado a todas as configuracoes de uma vez. A semantica de cada
+# linha e a mesma de um TomasuloSimulator isolado, com tres diferencas: os
+# valores sao inteiros de 64 bits, a divisao por zero produz 0 (e marca
+# div_by_zero) e stores/desvios deixam 0 no ROB no lugar das sentinelas
+# "MEM_STORED"/"BRANCH_EVALUATED". Sem bypass_issue, um consumidor com tag
+# velha pode receber esse resultado (ver tomasulo_fuzz.py): o
+# TomasuloSimulator propaga o texto (ou levanta TypeError) e o lote propaga 0.
+
+OPCODES = ['ADD', 'SUB', 'OR', 'AND', 'MUL', 'DIV', 'SLLI', 'SRLI',
+           'LW', 'LB', 'SW', 'SB', 'BEQ', 'BNE']
+OPCODE_INDEX = {op: i for i, op in enumerate(OPCODES)}
+
+# Tipos de instrucao no ROB
+TYPE_ALU, TYPE_LOAD, TYPE_STORE, TYPE_BRANCH = range(4)
+TYPE_OF_OPCODE = {
+    'LW': TYPE_LOAD, 'LB': TYPE_LOAD, 'SW': TYPE_STORE, 'SB': TYPE_STORE,
+    'BEQ': TYPE_BRANCH, 'BNE': TYPE_BRANCH,
+}
+
+# Estados de uma entrada do ROB (mesmos nomes do TomasuloSimulator); EMPTY = livre
+EMPTY, ISSUED, EXECUTING, READY, WRITE, COMMIT = range(6)
+# Estados com resultado ja calculado (fontes da rede de bypass)
+COMPLETED = np.zeros(6, dtype=bool)
+COMPLETED[[READY, WRITE, COMMIT]] = True
+STATE_NAMES = ["", "Issued", "Executing", "Ready to Write", "Write Result", "Commit"]
+
+# Ocupacao de uma estacao de reserva. Os blocos por classe tem o tamanho maximo entre
+# as configuracoes; as estacoes alem do numero de uma configuracao ficam UNUSED
+RS_FREE, RS_BUSY, RS_UNUSED = range(3)
+
+# Colunas de memoria pre-alocadas no minimo
+MEMORY_MIN_COLUMNS = 64
+
+# Operacoes calculadas por _finish_execution (DIV e tratada a parte por causa da divisao por zero)
+ALU_OPERATIONS = {
+    OPCODE_INDEX['ADD']: np.add,
+    OPCODE_INDEX['SUB']: np.subtract,
+    OPCODE_INDEX['OR']: np.bitwise_or,
+    OPCODE_INDEX['AND']: np.bitwise_and,
+    OPCODE_INDEX['MUL']: np.multiply,
+    OPCODE_INDEX['SLLI']: lambda a, b: np.left_shift(a, np.minimum(np.maximum(b, 0), 63)),
+    OPCODE_INDEX['SRLI']: lambda a, b: np.right_shift(a, np.minimum(np.maximum(b, 0), 63)),
+}
+BRANCH_CONDITIONS = {
+    OPCODE_INDEX['BEQ']: np.equal,
+    OPCODE_INDEX['BNE']: np.not_equal,
+}
+
+CONFIG_DEFAULTS = {
+    "num_mem_rs": 2, "num_add_rs": 3, "num_logic_rs": 2, "num_mult_rs": 1, "rob_size": 8,
+    "bypass_issue": False, "bypass_wakeup": False,
+}
+RS_COUNT_KEYS = ["num_mem_rs", "num_add_rs", "num_logic_rs", "num_mult_rs"]
+
+
+# --- Classe BatchTomasuloSimulator ---
+class BatchTomasuloSimulator:
+    def __init__(self, configs):
+        # configs: lista de dicts com os parametros do TomasuloSimulator
+        # (num_mem_rs, num_add_rs, num_logic_rs, num_mult_rs, rob_size, latencies,
+        # bypass_issue, bypass_wakeup)
+        self.configs = [dict(CONFIG_DEFAULTS, **config) for config in configs]
+        self.num_configs = len(self.configs)
+        if self.num_configs == 0:
+            raise ValueError("E necessario pelo menos uma configuracao.")
+
+        K = self.num_configs
+        self.lanes = np.arange(K)
+
+        self.rob_size = np.array([c["rob_size"] for c in self.configs], dtype=np.int64)
+        self.max_rob_size = int(self.rob_size.max())
+        self.bypass_issue = np.array([bool(c["bypass_issue"]) for c in self.configs])
+        self.bypass_wakeup = np.array([bool(c["bypass_wakeup"]) for c in self.configs])
+        self.any_bypass_issue = bool(self.bypass_issue.any())
+        self.any_bypass_wakeup = bool(self.bypass_wakeup.any())
+
+        # Estacoes de reserva em blocos de mesmo tamanho por classe: a estacao b da
+        # classe u e a linha u * rs_block_size + b dos arrays (estacao, configuracao)
+        rs_counts = np.array([[c[key] for key in RS_COUNT_KEYS] for c in self.configs], dtype=np.int64)
+        self.num_units = len(UNIT_CLASSES)
+        self.rs_block_size = max(int(rs_counts.max()), 1)
+        self.num_rs = self.num_units * self.rs_block_size
+        position_in_block = np.arange(self.rs_block_size)[None, :, None]
+        self.rs_idle_phase = np.where(position_in_block < rs_counts.T[:, None, :], RS_FREE, RS_UNUSED)
+        self.rs_idle_phase = self.rs_idle_phase.reshape(self.num_rs, K).astype(np.int8)
+
+        self.latency_table = np.empty((K, len(OPCODES)), dtype=np.int64)
+        for k, config in enumerate(self.configs):
+            latencies = dict(DEFAULT_LATENCIES)
+            latencies.update(config.get("latencies") or {})
+            self.latency_table[k] = [latencies.get(op, 1) for op in OPCODES]
+
+        self.program_instructions = []
+        self.register_names = []
+        self._initial_registers = {}
+        self._initial_memory = {}
+        self._set_program([])
+
+    # --- Carga do programa ---
+    # initial_state: InitialState ou arquivo de estado; initial_registers/initial_memory sao aplicados por cima
+    def load_instructions(self, filename=DEFAULT_PROGRAM_FILE, initial_registers=None, initial_memory=None,
+                          initial_state=None):
+        with open(filename, 'r') as f:
+            self.load_program(f.readlines(), initial_registers, initial_memory, initial_state)
+
+    def load_program(self, lines, initial_registers=None, initial_memory=None, initial_state=None):
+        state = load_state(initial_state)
+        self._initial_registers = dict(state.registers) if state is not None else {}
+        self._initial_registers.update(initial_registers or {})
+        # Regioes da imagem sao lidas sob demanda, so nos enderecos que o programa toca
+        self._initial_memory = state.build_memory() if state is not None else SimulatorMemory()
+        self._initial_memory.update(initial_memory or {})
+        self._set_program(parse_program(lines))
+
+    def _set_program(self, program):
+        self.program_instructions = program
+        self.program_length = len(program)
+
+        names = []
+        for inst in program:
+            for reg_name in (inst.destination, inst.source1, inst.source2):
+                if reg_name and reg_name not in names:
+                    names.append(reg_name)
+        for reg_name in self._initial_registers:
+            if reg_name not in names:
+                names.append(reg_name)
+        self.register_names = names
+        self.register_index = {name: i for i, name in enumerate(names)}
+        self.r0_index = self.register_index.get('R0', -1)
+        # Duas colunas extras: fontes ausentes leem zero_register (sempre 0, nunca
+        # renomeado) e instrucoes sem destino renomeiam sink_register, que ninguem le
+        self.zero_register = len(names)
+        self.sink_register = len(names) + 1
+
+        def reg(name, missing):
+            return self.register_index[name] if name else missing
+
+        L = max(self.program_length, 1)
+        self.inst_op = np.zeros(L, dtype=np.int64)
+        self.inst_unit = np.zeros(L, dtype=np.int64)
+        self.inst_type = np.zeros(L, dtype=np.int64)
+        self.inst_dest = np.full(L, self.sink_register, dtype=np.int64)
+        self.inst_sources = np.full((L, 2), self.zero_register, dtype=np.int64)
+        self.inst_imm = np.zeros(L, dtype=np.int64)
+        self.inst_addr = np.zeros(L, dtype=np.int64)
+        for i, inst in enumerate(program):
+            self.inst_op[i] = OPCODE_INDEX[inst.opname]
+            self.inst_unit[i] = UNIT_OF_OPCODE[inst.opname]
+            self.inst_type[i] = TYPE_OF_OPCODE.get(inst.opname, TYPE_ALU)
+            # Apenas instrucoes ALU/LOAD renomeiam o registrador de destino
+            if self.inst_type[i] in (TYPE_ALU, TYPE_LOAD):
+                self.inst_dest[i] = reg(inst.destination, self.sink_register)
+            # SLLI/SRLI nao tem segunda fonte: Vk = 0 + imediato
+            self.inst_sources[i] = [reg(inst.source1, self.zero_register), reg(inst.source2, self.zero_register)]
+            self.inst_imm[i] = inst.immediate or 0
+            self.inst_addr[i] = inst.address or 0
+        self.inst_is_mem = self.inst_unit == UNIT_OF_OPCODE['LW']
+        self.inst_is_branch = self.inst_type == TYPE_BRANCH
+        # Valor inicial de rs_end na emissao
+        self.inst_negative_latency = -self.latency_table[:, self.inst_op]
+
+        self.reset_simulator()
+
+    # Reseta todas as configuracoes para o estado inicial do programa carregado
+    def reset_simulator(self):
+        K, R, S = self.num_configs, self.max_rob_size, self.num_rs
+        NR = len(self.register_names) + 2
+
+        # Os estagios indexam as versoes achatadas (prefixo _) dos arrays, com os
+        # deslocamentos de cada configuracao em _reg_rows/_rob_rows
+        self.reg_value = np.zeros((K, NR), dtype=np.int64)
+        for name, value in self._initial_registers.items():
+            self.reg_value[:, self.register_index[name]] = value
+        # Tag do ROB produtor (-1 = registrador pronto)
+        self.reg_tag = np.full((K, NR), -1, dtype=np.int64)
+        self._reg_value = self.reg_value.reshape(-1)
+        self._reg_tag = self.reg_tag.reshape(-1)
+        self._reg_rows = self.lanes * NR
+
+        # Uma entrada esta ocupada enquanto o estado nao e EMPTY
+        self.rob_state = np.zeros((K, R), dtype=np.int8)
+        self.rob_inst = np.zeros((K, R), dtype=np.int64)
+        self.rob_value = np.zeros((K, R), dtype=np.int64)
+        self.rob_actual_taken = np.zeros((K, R), dtype=bool)
+        # Indice achatado da estacao de origem
+        self.rob_source_rs = np.zeros((K, R), dtype=np.int64)
+        self._rob_state = self.rob_state.reshape(-1)
+        self._rob_inst = self.rob_inst.reshape(-1)
+        self._rob_value = self.rob_value.reshape(-1)
+        self._rob_actual_taken = self.rob_actual_taken.reshape(-1)
+        self._rob_source_rs = self.rob_source_rs.reshape(-1)
+        self._rob_rows = self.lanes * R
+
+        # Estacoes com layout (estacao, configuracao): a escolha por unidade funcional
+        # reduz sobre o eixo do meio de (unidade, estacao, configuracao)
+        self.rs_phase = self.rs_idle_phase.copy()
+        # Operandos j e k empilhados, para o broadcast do CDB comparar as duas tags de uma vez
+        self.rs_v = np.zeros((2, S, K), dtype=np.int64)
+        self.rs_q = np.full((2, S, K), -1, dtype=np.int64)
+        # Indice achatado da entrada do ROB de destino e ordem de inicio (ID no ROB, estacao)
+        self.rs_dest = np.zeros((S, K), dtype=np.int64)
+        self.rs_order = np.zeros((S, K), dtype=np.int64)
+        # rs_order das estacoes com os operandos prontos que ainda nao iniciaram; as
+        # demais ficam em no_candidate (mantido na emissao, no despertar e no inicio)
+        self.no_candidate = R * S
+        self.rs_priority = np.full((S, K), self.no_candidate, dtype=np.int64)
+        # Ultimo ciclo de execucao; antes do inicio guarda -latencia (nunca igual a um ciclo)
+        self.rs_end = np.full((S, K), -1, dtype=np.int64)
+        self._rs_phase = self.rs_phase.reshape(-1)
+        self._rs_v = self.rs_v.reshape(-1)
+        self._rs_q = self.rs_q.reshape(-1)
+        self._rs_dest = self.rs_dest.reshape(-1)
+        self._rs_order = self.rs_order.reshape(-1)
+        self._rs_priority = self.rs_priority.reshape(-1)
+        self._rs_end = self.rs_end.reshape(-1)
+        self._rs_phase_blocks = self.rs_phase.reshape(self.num_units, self.rs_block_size, K)
+        self._operand_offsets = np.array([0, S * K])
+
+        # Memoria densa: uma coluna por endereco tocado. self.memory e pre-alocada
+        # (capacidade dobrada quando acaba) com os enderecos ja conhecidos na carga:
+        # os da memoria inicial e o deslocamento de cada load/store somado ao valor
+        # inicial do registrador base. As colunas sao achadas por busca binaria.
+        self.memory_columns = {}
+        self.memory_addresses = []
+        self._sorted_addresses = np.zeros(0, dtype=np.int64)
+        self._sorted_columns = np.zeros(0, dtype=np.int64)
+        is_mem = self.inst_is_mem[:self.program_length]
+        base_value = self.reg_value[0, self.inst_sources[:self.program_length, 0][is_mem]]
+        known = np.union1d(np.array(list(self._initial_memory), dtype=np.int64),
+                           self.inst_addr[:self.program_length][is_mem] + base_value)
+        self.memory = np.zeros((K, max(MEMORY_MIN_COLUMNS, 2 * len(known))), dtype=np.int64)
+        self._memory = self.memory.reshape(-1)
+        if len(known):
+            self._add_memory_addresses(known)
+
+        self.program_counter = np.zeros(K, dtype=np.int64)
+        self.rob_head = np.zeros(K, dtype=np.int64)
+        self.rob_tail = np.zeros(K, dtype=np.int64)
+        self.current_rob_entries = np.zeros(K, dtype=np.int64)
+        self.current_cycle = np.zeros(K, dtype=np.int64)
+        self.committed_instructions_count = np.zeros(K, dtype=np.int64)
+        self.bubble_cycles = np.zeros(K, dtype=np.int64)
+        self.bypassed_operands = np.zeros(K, dtype=np.int64)
+        self.div_by_zero = np.zeros(K, dtype=bool)
+
+    # Retorna as colunas de memoria dos enderecos, alocando as que faltam
+    def _memory_columns(self, addresses):
+        if len(self._sorted_addresses):
+            position = np.minimum(np.searchsorted(self._sorted_addresses, addresses), len(self._sorted_addresses) - 1)
+            found = self._sorted_addresses[position] == addresses
+            if np.count_nonzero(found) == len(found):
+                return self._sorted_columns[position]
+            missing = addresses[~found]
+        else:
+            missing = addresses
+        self._add_memory_addresses(np.unique(missing))
+        return self._memory_columns(addresses)
+
+    # Aloca colunas para enderecos novos (ordenados, sem repeticao)
+    def _add_memory_addresses(self, new):
+        start = len(self.memory_addresses)
+        needed = start + len(new)
+        if needed > self.memory.shape[1]:
+            grown = np.zeros((self.num_configs, max(2 * self.memory.shape[1], needed)), dtype=np.int64)
+            grown[:, :start] = self.memory[:, :start]
+            self.memory = grown
+            self._memory = grown.reshape(-1)
+        new = new.tolist()
+        for offset, addr in enumerate(new):
+            self.memory_columns[addr] = start + offset
+        self.memory_addresses.extend(new)
+        self.memory[:, start:needed] = np.array([self._initial_memory.get(a, 0) for a in new], dtype=np.int64)
+
+        addresses = np.array(self.memory_addresses, dtype=np.int64)
+        order = np.argsort(addresses)
+        self._sorted_addresses = addresses[order]
+        self._sorted_columns = order
+
+    # --- Execucao ---
+    def is_finished(self):
+        return (self.program_counter >= self.program_length) & (self.current_rob_entries == 0)
+
+    def run(self, max_cycles=None):
+        finished = self.is_finished()
+        while True:
+            active = ~finished
+            if max_cycles is not None:
+                active &= self.current_cycle < max_cycles
+            if not np.count_nonzero(active):
+                break
+            finished = self._tick(active, finished)
+        return self.get_metrics()
+
+    # Avanca em um ciclo todas as configuracoes ativas (por padrao, as nao terminadas)
+    def clock_tick(self, active=None):
+        finished = self.is_finished()
+        self._tick(~finished if active is None else active, finished)
+
+    # Retorna is_finished() ao fim do ciclo
+    def _tick(self, active, finished):
+        self.current_cycle += active
+        # Uma configuracao terminada nao tem trabalho em nenhum estagio, entao a mascara
+        # so e aplicada quando alguma nao terminada esta parada (max_cycles, clock_tick)
+        mask = active if np.count_nonzero(active | finished) < self.num_configs else None
+
+        committed = self.commit_stage(mask)
+        self.write_result_stage(mask)
+        self.execute_stage(mask)
+        issued = self.issue_stage(mask)
+
+        finished = self.is_finished()
+        self.bubble_cycles += active & ~(issued | committed | finished)
+        return finished
+
+    # Cada estagio recebe a mascara de configuracoes ativas (None = todas) e retorna cedo
+    # quando nenhuma tem trabalho nele: o custo de um ciclo e dominado pelo numero de
+    # operacoes NumPy, nao pelo tamanho dos arrays. Pelo mesmo motivo os testes usam
+    # np.count_nonzero e os indices vem de .nonzero()[0], sem os envoltorios em Python
+    # de .any() e np.flatnonzero
+
+    # --- Estagio de Confirmacao (Commit) ---
+    def commit_stage(self, active=None):
+        head = self._rob_rows + self.rob_head
+        head_state = self._rob_state[head]
+        if active is not None:
+            head_state = np.where(active, head_state, EMPTY)
+
+        # A cabeca entra em COMMIT num ciclo e sai no seguinte
+        enter_commit = head_state == WRITE
+        retire = head_state == COMMIT
+        self._rob_state[head[enter_commit]] = COMMIT
+        k = retire.nonzero()[0]
+        if not len(k):
+            return enter_commit
+
+        h = head[k]
+        inst = self._rob_inst[h]
+        # So grava o registrador se a tag ainda for desta entrada (stores e desvios usam sink_register)
+        reg = self._reg_rows[k] + self.inst_dest[inst]
+        owner = self._reg_tag[reg] == self.rob_head[k]
+        reg = reg[owner]
+        self._reg_value[reg] = self._rob_value[h[owner]]
+        self._reg_tag[reg] = -1
+        self._rob_state[h] = EMPTY
+
+        self.committed_instructions_count += retire
+        self.current_rob_entries -= retire
+        self.rob_head += retire
+        self.rob_head %= self.rob_size
+
+        # A previsao e sempre NOT_TAKEN: todo desvio tomado e um misprediction
+        mispredict = self.inst_is_branch[inst] & self._rob_actual_taken[h]
+        if np.count_nonzero(mispredict):
+            self._flush(k[mispredict], inst[mispredict])
+        return enter_commit | retire
+
+    def _flush(self, k, inst):
+        self.program_counter[k] = self.inst_addr[inst]
+        # Toda tag de registrador aponta para uma entrada ocupada, e todas sao descartadas
+        self.reg_tag[k] = -1
+        if self.r0_index >= 0:
+            self.reg_value[k, self.r0_index] = 0
+        self.rob_state[k] = EMPTY
+        self.rob_tail[k] = self.rob_head[k]
+        self.current_rob_entries[k] = 0
+        self.rs_phase[:, k] = self.rs_idle_phase[:, k]
+        self.rs_q[:, :, k] = -1
+        self.rs_priority[:, k] = self.no_candidate
+        self.rs_end[:, k] = -1
+        self.bubble_cycles[k] += 1
+
+    # --- Estagio de Escrita de Resultado (Write Result - CDB) ---
+    def write_result_stage(self, active=None):
+        ready = self.rob_state == READY
+        if active is not None:
+            ready &= active[:, None]
+        if not np.count_nonzero(ready):
+            return
+        rob_id = ready.argmax(axis=1)
+        entry = self._rob_rows + rob_id
+        has_candidate = ready.reshape(-1)[entry]
+        value = self._rob_value[entry]
+        broadcast = np.where(has_candidate, rob_id, -2)
+        entry = entry[has_candidate]
+        self._rob_state[entry] = WRITE
+        # A estacao de origem e liberada aqui, antes de a entrada do ROB sair, e o flush
+        # de um misprediction libera todas: nao ha estacoes inconsistentes a limpar
+        self._rs_phase[self._rob_source_rs[entry]] = RS_FREE
+
+        # Broadcast no CDB para as estacoes que aguardam o resultado (estacoes livres tem Q = -1)
+        wake = (self.rs_q == broadcast).ravel().nonzero()[0]
+        if len(wake):
+            self._rs_v[wake] = value[wake % self.num_configs]
+            self._rs_q[wake] = -1
+            self._wake(wake % (self.num_rs * self.num_configs))
+
+    # Habilita o inicio das estacoes rs (indices achatados) que ficaram com os dois operandos
+    def _wake(self, rs):
+        rs = rs[(self._rs_q[rs] == -1) & (self._rs_q[rs + self.num_rs * self.num_configs] == -1)]
+        self._rs_priority[rs] = self._rs_order[rs]
+
+    # --- Estagio de Execucao (Execute) ---
+    def execute_stage(self, active=None):
+        K, S = self.num_configs, self.num_rs
+        # Bypass: resultados ja calculados que ainda aguardam o CDB acordam as estacoes dependentes
+        if self.any_bypass_wakeup:
+            self._bypass_wakeup(self.bypass_wakeup if active is None else self.bypass_wakeup & active)
+
+        # Estacoes que ja estavam executando e terminam neste ciclo
+        finishing = self.rs_end == self.current_cycle
+        if active is not None:
+            finishing &= active
+        finished = finishing.ravel().nonzero()[0]
+
+        # Inicia no maximo uma instrucao por unidade funcional (a de menor ID no ROB)
+        first = self.rs_priority.reshape(self.num_units, self.rs_block_size, K).min(axis=1)
+        if active is not None:
+            first = np.where(active, first, self.no_candidate)
+        first = first.reshape(-1)
+        unit_lane = (first < self.no_candidate).nonzero()[0]
+        if len(unit_lane):
+            k = unit_lane % K
+            rs = first[unit_lane] % S * K + k
+            self._rs_priority[rs] = self.no_candidate
+            self._rob_state[self._rs_dest[rs]] = EXECUTING
+            cycle = self.current_cycle[k]
+            end = cycle - self._rs_end[rs] - 1
+            self._rs_end[rs] = end
+            done = end == cycle
+            if np.count_nonzero(done):
+                # As que ja executavam terminam antes das recem-iniciadas (ordem dos acessos a memoria)
+                rs = rs[done]
+                self._finish_execution(np.concatenate([finished, rs]), np.concatenate([finished // K, rs // K + S]))
+                return
+        self._finish_execution(finished, finished // K)
+
+    def _bypass_wakeup(self, lanes):
+        waiting = ((self.rs_q >= 0) & lanes).ravel().nonzero()[0]
+        if not len(waiting):
+            return
+        k = waiting % self.num_configs
+        producer = self._rob_rows[k] + self._rs_q[waiting]
+        ready = COMPLETED[self._rob_state[producer]]
+        waiting, k, producer = waiting[ready], k[ready], producer[ready]
+        self._rs_v[waiting] = self._rob_value[producer]
+        self._rs_q[waiting] = -1
+        self._wake(waiting % (self.num_rs * self.num_configs))
+        self.bypassed_operands += np.bincount(k, minlength=self.num_configs)
+
+    # Calcula o resultado das estacoes rs (indices achatados) que terminaram de
+    # executar; order (por estacao) define a sequencia dos acessos a memoria feitos no mesmo ciclo
+    def _finish_execution(self, rs, order):
+        if not len(rs):
+            return
+        K = self.num_configs
+        rob = self._rs_dest[rs]
+        self._rob_state[rob] = READY
+        inst = self._rob_inst[rob]
+        op = self.inst_op[inst]
+        vj = self._rs_v[rs]
+        vk = self._rs_v[rs + self.num_rs * K]
+
+        # So os opcodes presentes neste ciclo sao calculados (loads/stores e desvios valem 0)
+        result = np.zeros(len(rs), dtype=np.int64)
+        taken = None
+        present = np.bincount(op, minlength=len(OPCODES)).nonzero()[0].tolist()
+        for opcode in present:
+            sel = True if len(present) == 1 else op == opcode
+            if opcode in ALU_OPERATIONS:
+                np.copyto(result, ALU_OPERATIONS[opcode](vj, vk), where=sel)
+            elif opcode == OPCODE_INDEX['DIV']:
+                div_zero = sel & (vk == 0)
+                self.div_by_zero[rs[div_zero] % K] = True
+                np.copyto(result, vj // np.where(vk == 0, 1, vk), where=sel & ~div_zero)
+            elif opcode in BRANCH_CONDITIONS:
+                if taken is None:
+                    taken = np.zeros(len(rs), dtype=bool)
+                np.copyto(taken, BRANCH_CONDITIONS[opcode](vj, vk), where=sel)
+        self._rob_value[rob] = result
+        if taken is not None:
+            self._rob_actual_taken[rob] = taken
+
+        # Acessos a memoria, na ordem das estacoes de reserva
+        is_mem = self.inst_is_mem[inst]
+        if np.count_nonzero(is_mem):
+            rs, order, rob, inst, vj, vk = rs[is_mem], order[is_mem], rob[is_mem], inst[is_mem], vj[is_mem], vk[is_mem]
+            columns = self._memory_columns(vj + self.inst_addr[inst])
+            cell = rs % K * self.memory.shape[1] + columns
+            is_store = self.inst_type[inst] == TYPE_STORE
+            if not np.count_nonzero(is_store):
+                self._rob_value[rob] = self._memory[cell]
+                return
+            for position in sorted(set(order.tolist())):
+                sel = order == position
+                store = sel & is_store
+                load = sel & ~is_store
+                self._memory[cell[store]] = vk[store]
+                self._rob_value[rob[load]] = self._memory[cell[load]]
+
+    # --- Estagio de Emissao (Issue) ---
+    def issue_stage(self, active=None):
+        K, S = self.num_configs, self.num_rs
+        can_fetch = self.program_counter < self.program_length
+        if active is not None:
+            can_fetch &= active
+        if not np.count_nonzero(can_fetch):
+            return can_fetch
+        inst = np.minimum(self.program_counter, max(self.program_length - 1, 0))
+        tail = self._rob_rows + self.rob_tail
+
+        # Primeira estacao livre do bloco da unidade de cada configuracao
+        unit = self.inst_unit[inst]
+        slot = unit * self.rs_block_size + (self._rs_phase_blocks[unit, :, self.lanes] == RS_FREE).argmax(axis=1)
+        rs = slot * K + self.lanes
+        issued = can_fetch & (self._rob_state[tail] == EMPTY) & (self._rs_phase[rs] == RS_FREE)
+        k = issued.nonzero()[0]
+        if not len(k):
+            return issued
+        if len(k) < K:
+            inst, tail, slot, rs = inst[k], tail[k], slot[k], rs[k]
+
+        # Aloca entrada no ROB
+        self._rob_state[tail] = ISSUED
+        self._rob_inst[tail] = inst
+        self._rob_source_rs[tail] = rs
+
+        # Aloca e configura a entrada na RS
+        self._rs_phase[rs] = RS_BUSY
+        self._rs_dest[rs] = tail
+        order = self.rob_tail[k] * S + slot
+        self._rs_order[rs] = order
+        self._rs_end[rs] = self.inst_negative_latency[k, inst]
+        value, tag = self._read_operands(k, self._reg_rows[k][:, None] + self.inst_sources[inst])
+        value[:, 1] += self.inst_imm[inst]
+        operand = rs[:, None] + self._operand_offsets
+        self._rs_v[operand] = value
+        self._rs_q[operand] = tag
+        # Tags sao >= -1: a soma so vale -2 com os dois operandos prontos
+        self._rs_priority[rs] = np.where(tag[:, 0] + tag[:, 1] == -2, order, self.no_candidate)
+
+        # Renomeacao do registrador de destino
+        self._reg_tag[self._reg_rows[k] + self.inst_dest[inst]] = self.rob_tail[k]
+
+        self.program_counter += issued
+        self.rob_tail += issued
+        self.rob_tail %= self.rob_size
+        self.current_rob_entries += issued
+        return issued
+
+    # Le os operandos fonte (reg: indices achatados, uma linha por instrucao): valor do
+    # registrador, valor ja escrito no ROB (ou ja calculado, com bypass_issue) ou tag do produtor
+    def _read_operands(self, k, reg):
+        tag = self._reg_tag[reg]
+        renamed = tag >= 0
+        # Sem tag o indice cai numa entrada qualquer, descartada por renamed
+        producer = self._rob_rows[k][:, None] + tag
+        state = self._rob_state[producer]
+        written = state == WRITE
+        if self.any_bypass_issue:
+            bypassed = renamed & ~written & COMPLETED[state] & self.bypass_issue[k][:, None]
+            if np.count_nonzero(bypassed):
+                written |= bypassed
+                self.bypassed_operands[k] += np.add(bypassed[:, 0], bypassed[:, 1], dtype=np.int64)
+        written &= renamed
+
+        value = np.where(written, self._rob_value[producer], self._reg_value[reg])
+        tag = np.where(written, -1, tag)
+        return value, tag
+
+    # --- Resultados ---
+    def get_metrics(self):
+        metrics = []
+        for k in range(self.num_configs):
+            total_cycles = int(self.current_cycle[k])
+            committed = int(self.committed_instructions_count[k])
+            metrics.append({
+                "Total Cycles": total_cycles,
+                "Committed Instructions": committed,
+                "IPC": committed / total_cycles if total_cycles > 0 else 0,
+                "Bubble Cycles": int(self.bubble_cycles[k]),
+                "Program Counter (PC)": int(self.program_counter[k]),
+                "Bypassed Operands": int(self.bypassed_operands[k]),
+            })
+        return metrics
+
+    def register_values(self, k):
+        return {name: int(self.reg_value[k, i]) for i, name in enumerate(self.register_names)}
+
+    def memory_values(self, k):
+        return {addr: int(self.memory[k, col]) for addr, col in self.memory_columns.items()}
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import tempfile
+
+# Cache em disco de resultados de simulacao, enderecado pelo conteudo.
+# A chave e o hash do programa ja decodificado, dos parametros do simulador,
+# das latencias e do estado inicial (registradores, memoria e o conteudo das
+# regioes mapeadas da imagem de estado). Cada resultado
+# e um arquivo JSON escrito de forma atomica (arquivo temporario + os.replace),
+# entao varios processos podem compartilhar o mesmo diretorio sem travas:
+# um leitor ve o arquivo completo ou nao ve nada. O tempo de modificacao do
+# arquivo marca o ultimo uso e guia a remocao LRU quando o limite de tamanho
+# e ultrapassado. Cada SimulationCache soma o tamanho do que grava e so varre
+# o diretorio quando a soma passa do limite (ou na primeira gravacao); com
+# varios processos o diretorio pode passar do limite ate a proxima varredura.
+
+# Incrementar quando a semantica do simulador mudar, invalidando o cache antigo
+CACHE_VERSION = 3
+
+DEFAULT_CACHE_DIR = ".tomasulo_cache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Fracao do limite ocupada apos uma remocao: a folga adia a proxima varredura
+EVICT_TARGET = 0.9
+
+
+# Calcula a chave do cache para o estado atual (inicial) do simulador. max_cycles
+# nao entra: so execucoes concluidas sao guardadas, e o resultado nao depende dele
+def simulation_key(simulator):
+    # O SMT tem um programa e um arquivo de registradores por thread, que a chave e o
+    # resultado nao representam
+    if getattr(simulator, "threads", None) is not None:
+        raise ValueError("O cache de resultados nao suporta o simulador SMT.")
+    program = [
+        [inst.opname, inst.destination, inst.source1, inst.source2, inst.immediate, inst.address, inst.latency]
+        for inst in simulator.program_instructions
+    ]
+    registers = sorted((name, reg.value) for name, reg in simulator.register_file.items())
+    memory = sorted(simulator.memory.changed_items())
+    description = {
+        "version": CACHE_VERSION,
+        "program": program,
+        "config": simulator.config,
+        "latencies": sorted(simulator.latencies.items()),
+        "registers": registers,
+        "memory": memory,
+        "regions": simulator.memory.describe_regions(),
+    }
+    encoded = json.dumps(description, sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+# Extrai metricas e estado arquitetural de um simulador ja executado
+def simulation_result(simulator):
+    return {
+        "finished": simulator.is_finished(),
+        "metrics": simulator.get_metrics(),
+        "mispredictions": simulator.mispredictions,
+        "registers": {name: reg.value for name, reg in simulator.register_file.items()},
+        "memory": sorted([addr, value] for addr, value in simulator.memory.changed_items()),
+    }
+
+
+# Aplica um resultado do cache ao simulador (pipeline vazio, estado arquitetural final)
+def apply_result(simulator, result):
+    for name, value in result["registers"].items():
+        reg = simulator.register_file.get(name)
+        if reg is not None:
+            reg.value = value
+            reg.clear()
+    # clear descarta so as escritas: as regioes da imagem continuam, e o resultado guarda o que difere delas
+    simulator.memory.clear()
+    for addr, value in result["memory"]:
+        simulator.memory[addr] = value
+    metrics = result["metrics"]
+    simulator.current_cycle = metrics["Total Cycles"]
+    simulator.committed_instructions_count = metrics["Committed Instructions"]
+    simulator.bubble_cycles = metrics["Bubble Cycles"]
+    simulator.program_counter = metrics["Program Counter (PC)"]
+    simulator.bypassed_operands = metrics.get("Bypassed Operands", 0)
+    simulator.mispredictions = result["mispredictions"]
+
+
+# --- Classe SimulationCache ---
+class SimulationCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Tamanho estimado do diretorio (None ate a primeira varredura)
+        self._total_bytes = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                result = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        # Marca o uso para a politica LRU
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(result, f, separators=(',', ':'))
+                size = f.tell()
+            try:
+                replaced = os.stat(self._path(key)).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        if self._total_bytes is None or self._total_bytes + size - replaced > self.max_bytes:
+            self._evict()
+        else:
+            self._total_bytes += size - replaced
+
+    # Varre o diretorio e, se ele passou do limite, remove os resultados usados ha
+    # mais tempo ate ocupar EVICT_TARGET do limite
+    def _evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".json") or entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total > self.max_bytes:
+            entries.sort()
+            target = self.max_bytes * EVICT_TARGET
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+        self._total_bytes = total
+
+    def clear(self):
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+        self._total_bytes = 0
+
+
+# Executa o simulador consultando o cache; em caso de acerto, o estado final e aplicado sem simular.
+# So execucoes concluidas sao guardadas: uma interrompida por max_cycles tem o pipeline
+# ocupado, que o resultado (so estado arquitetural) nao reconstroi. Um acerto que
+# precisou de mais ciclos que max_cycles e ignorado e a simulacao roda de verdade
+def run_cached(simulator, cache, max_cycles=None):
+    key = simulation_key(simulator)
+    result = cache.get(key)
+    if (result is not None and result["finished"]
+            and (max_cycles is None or result["metrics"]["Total Cycles"] <= max_cycles)):
+        apply_result(simulator, result)
+        return result
+
+    simulator.run(max_cycles)
+    result = simulation_result(simulator)
+    if result["finished"]:
+        cache.put(key, result)
+    return result
@@ -0,0 +1,354 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import re
+import sys
+import time
+
+from tomasulo_sim import TomasuloSimulator, Register, parse_program
+
+# Fuzzing diferencial do TomasuloSimulator contra um interpretador de
+# referencia em ordem. Cada caso e um programa aleatorio valido na sintaxe de
+# load_instructions (desvios apenas para frente, entao sempre termina), com
+# registradores, memoria e configuracao do simulador tambem aleatorios. Os
+# registradores e a memoria finais das duas execucoes sao comparados; um caso
+# que falha e reduzido (shrinking) ate um programa minimo que ainda falha do
+# mesmo jeito. Os casos sao distribuidos entre processos (multiprocessing).
+#
+# Divergencias conhecidas do simulador atual, que o fuzzing encontra quando
+# os grupos correspondentes estao ativos:
+#   - stores escrevem na memoria durante a execucao, inclusive em caminho
+#     especulativo (desvio previsto como nao tomado e depois tomado);
+#   - loads nao esperam stores anteriores (sem desambiguacao de memoria);
+#   - sem bypass_issue, um consumidor emitido enquanto o produtor esta em
+#     "Commit" pode nunca acordar (o simulador nao termina);
+#   - pela mesma tag velha, quando a entrada do ROB e reutilizada por um
+#     store ou desvio, o consumidor recebe o resultado dele, a sentinela
+#     "MEM_STORED" ou "BRANCH_EVALUATED", e a operacao levanta TypeError
+#     (ex.: --bypass off, seed 483: "unsupported operand type(s) for |:
+#     'str' and 'int'"). So o TypeError com uma sentinela como operando de
+#     uma estacao de reserva e classificado como "sentinela"; as demais
+#     excecoes sao "excecao". Com --bypass off sao 16 dos 2000 casos das
+#     seeds 0 a 1999;
+#   - o commit so grava o registrador se a tag ainda for a sua: se uma
+#     instrucao mais nova (especulativa) o renomeou e depois e descartada
+#     pela misprediction, o valor confirmado se perde.
+# Use --no-memory / --no-branches / --bypass para isolar outras regressoes, e
+# --ignore (tipos conhecidos) ou --baseline (falhas de uma execucao anterior)
+# para que o codigo de saida so acuse falhas novas.
+
+REGISTERS = ['R0', 'R1', 'R2', 'R3', 'R4', 'R5', 'R6', 'R7']
+# R0 nao e destino: a recuperacao de misprediction zera R0
+DESTINATION_REGISTERS = REGISTERS[1:]
+
+ALU_OPCODES = ['ADD', 'SUB', 'OR', 'AND', 'MUL', 'SLLI', 'SRLI']
+MEMORY_OPCODES = ['LW', 'LB', 'SW', 'SB']
+BRANCH_OPCODES = ['BEQ', 'BNE']
+
+MEMORY_SIZE = 16
+CYCLES_PER_INSTRUCTION_LIMIT = 50
+
+# Resultados textuais que stores e desvios deixam no ROB
+SENTINELS = ("MEM_STORED", "BRANCH_EVALUATED")
+FAILURE_KINDS = ["sentinela", "excecao", "nao_terminou", "registradores", "memoria"]
+
+
+# --- Geracao ---
+def generate_program(rng, length, memory=True, branches=True):
+    opcodes = list(ALU_OPCODES)
+    if memory:
+        opcodes += MEMORY_OPCODES
+    if branches:
+        opcodes += BRANCH_OPCODES
+
+    lines = []
+    for i in range(length):
+        op = rng.choice(opcodes)
+        rd = rng.choice(DESTINATION_REGISTERS)
+        rs = rng.choice(REGISTERS)
+        rt = rng.choice(REGISTERS)
+        if op in ('SLLI', 'SRLI'):
+            lines.append(f"{op} {rd}, {rs}, {rng.randint(0, 3)}")
+        elif op in ('LW', 'LB'):
+            lines.append(f"{op} {rd}, R0, {rng.randrange(MEMORY_SIZE)}")
+        elif op in ('SW', 'SB'):
+            lines.append(f"{op} {rt}, R0, {rng.randrange(MEMORY_SIZE)}")
+        elif op in BRANCH_OPCODES:
+            lines.append(f"{op} {rs}, {rt}, {rng.randint(i + 1, length)}")
+        else:
+            lines.append(f"{op} {rd}, {rs}, {rt}")
+    return lines
+
+
+def generate_state(rng):
+    registers = {name: rng.randint(-4, 8) for name in REGISTERS}
+    registers['R0'] = 0
+    memory = {addr: rng.randint(-4, 8) for addr in rng.sample(range(MEMORY_SIZE), 4)}
+    return registers, memory
+
+
+def generate_config(rng, bypass=None):
+    config = {
+        "num_mem_rs": rng.randint(1, 3),
+        "num_add_rs": rng.randint(1, 3),
+        "num_logic_rs": rng.randint(1, 3),
+        "num_mult_rs": rng.randint(1, 2),
+        "rob_size": rng.choice([2, 4, 8, 16]),
+        "latencies": {op: rng.randint(1, 5) for op in rng.sample(['ADD', 'SUB', 'MUL', 'LW', 'SW', 'OR'], 2)},
+    }
+    if bypass is None:
+        config["bypass_issue"] = rng.random() < 0.5
+        config["bypass_wakeup"] = rng.random() < 0.5
+    else:
+        config["bypass_issue"] = config["bypass_wakeup"] = bypass
+    return config
+
+
+# --- Referencia ---
+# Interpretador em ordem: uma instrucao por passo, sem especulacao
+def run_reference(lines, registers, memory):
+    program = parse_program(lines)
+    regs = dict(registers)
+    mem = dict(memory)
+    pc = 0
+    while pc < len(program):
+        inst = program[pc]
+        op = inst.opname
+        pc += 1
+        if op in ('SLLI', 'SRLI'):
+            value = regs.get(inst.source1, 0)
+            regs[inst.destination] = value << inst.immediate if op == 'SLLI' else value >> inst.immediate
+        elif op in ('LW', 'LB'):
+            regs[inst.destination] = mem.get(regs.get(inst.source1, 0) + inst.address, 0)
+        elif op in ('SW', 'SB'):
+            mem[regs.get(inst.source1, 0) + inst.address] = regs.get(inst.source2, 0)
+        elif op in BRANCH_OPCODES:
+            equal = regs.get(inst.source1, 0) == regs.get(inst.source2, 0)
+            if equal == (op == 'BEQ'):
+                pc = inst.address
+        else:
+            a = regs.get(inst.source1, 0)
+            b = regs.get(inst.source2, 0)
+            if op == 'ADD': regs[inst.destination] = a + b
+            elif op == 'SUB': regs[inst.destination] = a - b
+            elif op == 'OR': regs[inst.destination] = a | b
+            elif op == 'AND': regs[inst.destination] = a & b
+            elif op == 'MUL': regs[inst.destination] = a * b
+            elif op == 'DIV': regs[inst.destination] = a // b if b != 0 else "DIV_BY_ZERO_ERROR"
+    return regs, mem
+
+
+def build_simulator(lines, registers, memory, config):
+    simulator = TomasuloSimulator(**config)
+    simulator.load_program(lines)
+    for name, value in registers.items():
+        if name not in simulator.register_file:
+            simulator.register_file[name] = Register(name)
+        simulator.register_file[name].value = value
+    for addr, value in memory.items():
+        simulator.memory[addr] = value
+    return simulator
+
+
+# O TypeError veio de uma sentinela se a mensagem acusa um operando str ("'str'",
+# "can only concatenate str") e alguma estacao de reserva tem uma sentinela como
+# operando (a que falhou nao e limpa)
+def is_sentinel_error(simulator, error):
+    if not re.search(r"\bstr\b", str(error)):
+        return False
+    return any(isinstance(value, str) and value in SENTINELS
+               for rs in simulator.reservation_stations for value in (rs.Vj, rs.Vk))
+
+
+# --- Verificacao ---
+# Retorna None se o simulador concorda com a referencia, ou (tipo, descricao)
+def check_case(lines, registers, memory, config):
+    max_cycles = CYCLES_PER_INSTRUCTION_LIMIT * (len(lines) + 1)
+    simulator = None
+    try:
+        simulator = build_simulator(lines, registers, memory, config)
+        simulator.run(max_cycles)
+    except Exception as e:
+        if isinstance(e, TypeError) and simulator is not None and is_sentinel_error(simulator, e):
+            return "sentinela", f"{type(e).__name__}: {e}"
+        return "excecao", f"{type(e).__name__}: {e}"
+    if not simulator.is_finished():
+        return "nao_terminou", f"nao terminou em {max_cycles} ciclos (PC={simulator.program_counter})"
+
+    ref_regs, ref_mem = run_reference(lines, registers, memory)
+    sim_regs = {name: reg.value for name, reg in simulator.register_file.items()}
+    wrong_regs = [f"{name}: sim={sim_regs.get(name, 0)} ref={ref_regs.get(name, 0)}"
+                  for name in sorted(set(sim_regs) | set(ref_regs))
+                  if sim_regs.get(name, 0) != ref_regs.get(name, 0)]
+    wrong_mem = [f"Mem[{addr}]: sim={simulator.memory.get(addr, 0)} ref={ref_mem.get(addr, 0)}"
+                 for addr in sorted(set(simulator.memory) | set(ref_mem))
+                 if simulator.memory.get(addr, 0) != ref_mem.get(addr, 0)]
+    if wrong_regs:
+        return "registradores", "; ".join(wrong_regs + wrong_mem)
+    if wrong_mem:
+        return "memoria", "; ".join(wrong_mem)
+    return None
+
+
+# --- Reducao (shrinking) ---
+# Remove count instrucoes a partir de start, corrigindo os alvos dos desvios
+def remove_instructions(lines, start, count):
+    result = []
+    for i, line in enumerate(lines):
+        if start <= i < start + count:
+            continue
+        tokens = line.split()
+        if tokens[0] in BRANCH_OPCODES:
+            target = int(tokens[3])
+            if target > start:
+                target = max(start, target - count)
+            line = f"{tokens[0]} {tokens[1]} {tokens[2]} {target}"
+        result.append(line)
+    return result
+
+
+# Reduz o programa (blocos cada vez menores) e depois o estado inicial,
+# mantendo o mesmo tipo de falha
+def shrink_case(lines, registers, memory, config, kind):
+    def still_fails(candidate_lines, candidate_regs, candidate_mem):
+        failure = check_case(candidate_lines, candidate_regs, candidate_mem, config)
+        return failure is not None and failure[0] == kind
+
+    chunk = max(len(lines) // 2, 1)
+    while chunk >= 1:
+        start = 0
+        while start < len(lines):
+            candidate = remove_instructions(lines, start, chunk)
+            if candidate and still_fails(candidate, registers, memory):
+                lines = candidate
+            else:
+                start += chunk
+        chunk //= 2
+
+    for name in sorted(registers):
+        if registers[name] != 0:
+            candidate = dict(registers, **{name: 0})
+            if still_fails(lines, candidate, memory):
+                registers = candidate
+    for addr in sorted(memory):
+        candidate = {a: v for a, v in memory.items() if a != addr}
+        if still_fails(lines, registers, candidate):
+            memory = candidate
+    return lines, registers, memory
+
+
+# --- Execucao em paralelo ---
+def fuzz_case(seed, options):
+    rng = random.Random(seed)
+    lines = generate_program(rng, rng.randint(1, options["length"]), options["memory"], options["branches"])
+    registers, memory = generate_state(rng)
+    config = generate_config(rng, options["bypass"])
+
+    failure = check_case(lines, registers, memory, config)
+    if failure is None:
+        return None
+    kind, _ = failure
+    # Falhas ignoradas ou ja conhecidas so entram na contagem
+    if kind in options["ignore"] or (seed, kind) in options["known"]:
+        return {"seed": seed, "kind": kind, "description": failure[1], "program": lines,
+                "registers": registers, "memory": memory, "config": config}
+    if options["shrink"]:
+        lines, registers, memory = shrink_case(lines, registers, memory, config, kind)
+    kind, description = check_case(lines, registers, memory, config)
+    return {
+        "seed": seed, "kind": kind, "description": description, "program": lines,
+        "registers": registers, "memory": memory, "config": config,
+    }
+
+
+def _fuzz_chunk(args):
+    seeds, options = args
+    # O simulador imprime cada misprediction; nos workers isso so atrapalha
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        results = [fuzz_case(seed, options) for seed in seeds]
+    return len(seeds), [result for result in results if result is not None]
+
+
+def fuzz(cases, seed=0, workers=None, chunk_size=64, **options):
+    options = dict({"length": 20, "memory": True, "branches": True, "bypass": None, "shrink": True,
+                    "ignore": (), "known": ()}, **options)
+    chunks = [(list(range(start, min(start + chunk_size, seed + cases))), options)
+              for start in range(seed, seed + cases, chunk_size)]
+    failures = []
+    checked = 0
+    with multiprocessing.Pool(workers) as pool:
+        for count, chunk_failures in pool.imap_unordered(_fuzz_chunk, chunks):
+            checked += count
+            failures.extend(chunk_failures)
+    failures.sort(key=lambda failure: failure["seed"])
+    return checked, failures
+
+
+def format_failure(failure):
+    lines = [f"[{failure['kind']}] seed {failure['seed']}: {failure['description']}",
+             f"  config: {failure['config']}",
+             f"  registradores: {failure['registers']}",
+             f"  memoria: {failure['memory']}"]
+    lines += [f"    {i}: {line}" for i, line in enumerate(failure["program"])]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzzing diferencial do simulador Tomasulo")
+    parser.add_argument("--cases", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0, help="semente do primeiro caso (casos usam seed, seed+1, ...)")
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrao: numero de CPUs)")
+    parser.add_argument("--length", type=int, default=20, help="tamanho maximo dos programas")
+    parser.add_argument("--no-memory", action="store_true", help="sem loads/stores")
+    parser.add_argument("--no-branches", action="store_true", help="sem desvios")
+    parser.add_argument("--bypass", choices=["on", "off"], help="fixa bypass_issue/bypass_wakeup (padrao: aleatorio)")
+    parser.add_argument("--no-shrink", action="store_true", help="nao reduz os casos que falham")
+    parser.add_argument("--show", type=int, default=5, help="falhas a imprimir")
+    parser.add_argument("--output", help="salva todas as falhas em JSON")
+    parser.add_argument("--ignore", default="",
+                        help=f"tipos de falha que nao afetam o codigo de saida, separados por virgula ({', '.join(FAILURE_KINDS)})")
+    parser.add_argument("--baseline", help="JSON de --output de uma execucao anterior: falhas com a mesma seed e tipo sao conhecidas")
+    args = parser.parse_args()
+
+    ignore = {kind for kind in args.ignore.split(',') if kind}
+    unknown = ignore - set(FAILURE_KINDS)
+    if unknown:
+        parser.error(f"tipos desconhecidos em --ignore: {', '.join(sorted(unknown))}")
+    known = set()
+    if args.baseline:
+        try:
+            with open(args.baseline) as f:
+                known = {(failure["seed"], failure["kind"]) for failure in json.load(f)}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            parser.error(f"baseline invalida: {e}")
+
+    bypass = None if args.bypass is None else args.bypass == "on"
+    start = time.perf_counter()
+    checked, failures = fuzz(args.cases, args.seed, args.workers, length=args.length,
+                             memory=not args.no_memory, branches=not args.no_branches,
+                             bypass=bypass, shrink=not args.no_shrink, ignore=ignore, known=known)
+    elapsed = time.perf_counter() - start
+
+    by_kind = {}
+    for failure in failures:
+        by_kind[failure["kind"]] = by_kind.get(failure["kind"], 0) + 1
+    new = [failure for failure in failures
+           if failure["kind"] not in ignore and (failure["seed"], failure["kind"]) not in known]
+    print(f"{checked} casos em {elapsed:.1f}s ({checked / elapsed:.0f} casos/s), {len(failures)} falhas {by_kind}")
+    if ignore or args.baseline:
+        print(f"{len(new)} falhas novas ({len(failures) - len(new)} ignoradas ou na baseline)")
+    # Falhas reduzidas em ordem de tamanho: as menores sao as mais faceis de depurar
+    for failure in sorted(new, key=lambda f: len(f["program"]))[:args.show]:
+        print()
+        print(format_failure(failure))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(failures, f, indent=2)
+    sys.exit(1 if new else 0)
+
+
+if __name__ == "__main__":
+    main()
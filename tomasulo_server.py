@@ -0,0 +1,578 @@
+import argparse
+import asyncio
+import json
+import os
+
+from tomasulo_sim import TomasuloSimulator, Register, PREDICT_TAKEN, PREDICT_NOT_TAKEN
+from tomasulo_state import DEFAULT_STATE_FILE, InitialState, create_default_state_file, inside_directory
+
+# Servidor de simulacao sem interface grafica. O TomasuloSimulator roda no
+# loop asyncio do servidor e os clientes conversam com ele por um socket
+# (TCP ou Unix) trocando uma mensagem JSON por linha.
+#
+# Comandos (cliente -> servidor), com "id" opcional repetido na resposta:
+#   {"cmd": "load", "program": [...], "config": {...},
+#    "state": "initial_state.txt", "registers": {"R1": 5}, "memory": {"108": 5}}
+#   (o programa vai no proprio comando: o servidor nunca abre caminhos enviados pelo
+#   cliente. "state" e o nome de um arquivo de estado dentro do diretorio --state-dir
+#   do servidor e troca a imagem inicial; registers/memory sao aplicados por cima)
+#   {"cmd": "step", "cycles": 1}   (responde como run_until, ao atingir o ciclo alvo)
+#   {"cmd": "run_until", "cycle": N, "pc": P, "max_cycles": M}   (para sempre no fim do programa)
+#   {"cmd": "pause"}
+#   {"cmd": "snapshot"}
+#   {"cmd": "subscribe"} / {"cmd": "unsubscribe"}
+#
+# Inscritos recebem um quadro por ciclo: um "snapshot" completo na inscricao
+# (e apos load/reset) e depois apenas "delta" com as entradas de ROB, RS,
+# registradores e memoria alteradas naquele ciclo (conjuntos dirty do
+# simulador). O texto do programa ("program") so vai no primeiro snapshot
+# de cada inscrito apos subscribe ou load; os demais snapshots o omitem. Cada inscrito tem uma fila limitada; se ela enche, os deltas
+# seguintes sao descartados e o cliente recebe um novo snapshot assim que
+# houver espaco. Um cliente lento perde quadros, mas nunca atrasa a simulacao.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Quadros pendentes por inscrito antes de comecar a descartar
+SUBSCRIBER_QUEUE_SIZE = 64
+# Sem inscritos, ciclos simulados entre duas devolucoes de controle ao loop
+RUN_YIELD_CYCLES = 256
+# Tamanho maximo de uma mensagem (uma linha JSON). O padrao do asyncio (64 KiB)
+# nao comporta o load ou o snapshot de programas com alguns milhares de instrucoes
+STREAM_LIMIT = 64 * 1024 * 1024
+
+# Ordem dos campos nas linhas compactas de cada tabela
+ROB_FIELDS = ["busy", "instruction", "state", "destination", "value", "type", "predicted", "actual"]
+RS_FIELDS = ["busy", "op", "Vj", "Vk", "Qj", "Qk", "destination_rob_id"]
+REGISTER_FIELDS = ["value", "reorder_tag", "busy"]
+
+
+def _branch_flag(taken):
+    if taken == PREDICT_TAKEN:
+        return "T"
+    if taken == PREDICT_NOT_TAKEN:
+        return "NT"
+    return None
+
+
+def rob_row(entry):
+    return [
+        entry.busy,
+        str(entry.instruction) if entry.instruction else None,
+        entry.state,
+        entry.destination_reg or None,
+        entry.value,
+        entry.inst_type or None,
+        _branch_flag(entry.predicted_taken),
+        _branch_flag(entry.actual_taken),
+    ]
+
+
+def rs_row(rs):
+    return [rs.busy, rs.op, rs.Vj, rs.Vk, rs.Qj, rs.Qk, rs.destination_rob_id]
+
+
+def register_row(reg):
+    return [reg.value, reg.reorder_tag, reg.busy]
+
+
+def _header(simulator, frame_type):
+    return {
+        "type": frame_type,
+        "cycle": simulator.current_cycle,
+        "pc": simulator.program_counter,
+        "rob_head": simulator.rob_head,
+        "finished": simulator.is_finished(),
+        "metrics": simulator.get_metrics(),
+    }
+
+
+# Estado completo do simulador; o texto do programa so e incluido se include_program
+def build_snapshot(simulator, program=None, include_program=True):
+    frame = _header(simulator, "snapshot")
+    frame["fields"] = {"rob": ROB_FIELDS, "rs": RS_FIELDS, "registers": REGISTER_FIELDS}
+    if include_program:
+        frame["program"] = program if program is not None else [str(inst) for inst in simulator.program_instructions]
+    frame["rob"] = [rob_row(entry) for entry in simulator.reorder_buffer]
+    frame["rs"] = {rs.name: rs_row(rs) for rs in simulator.reservation_stations}
+    frame["registers"] = {name: register_row(reg) for name, reg in simulator.register_file.items()}
+    frame["memory"] = sorted([addr, value] for addr, value in simulator.memory.items())
+    return frame
+
+
+# Apenas as entradas alteradas (resultado de simulator.consume_dirty())
+def build_delta(simulator, dirty_rob, dirty_rs, dirty_registers, dirty_memory, rs_by_name):
+    frame = _header(simulator, "delta")
+    if dirty_rob:
+        frame["rob"] = {rob_id: rob_row(simulator.reorder_buffer[rob_id]) for rob_id in dirty_rob}
+    if dirty_rs:
+        frame["rs"] = {name: rs_row(rs_by_name[name]) for name in dirty_rs}
+    if dirty_registers:
+        frame["registers"] = {name: register_row(simulator.register_file[name]) for name in dirty_registers}
+    if dirty_memory:
+        frame["memory"] = [[addr, simulator.memory[addr]] for addr in sorted(dirty_memory)]
+    return frame
+
+
+# Aplica um quadro (snapshot ou delta) a uma copia local do estado; retorna o novo estado
+def apply_frame(state, frame):
+    if frame["type"] == "snapshot":
+        previous = state
+        state = dict(frame)
+        # Snapshots de ressincronizacao nao trazem o programa: mantem o ja recebido
+        if "program" not in frame and previous is not None:
+            state["program"] = previous.get("program")
+        state["rob"] = list(frame["rob"])
+        state["rs"] = dict(frame["rs"])
+        state["registers"] = dict(frame["registers"])
+        state["memory"] = {addr: value for addr, value in frame["memory"]}
+        return state
+    if state is None:
+        return None
+
+    for key in ("cycle", "pc", "rob_head", "finished", "metrics"):
+        state[key] = frame[key]
+    for rob_id, row in frame.get("rob", {}).items():
+        state["rob"][int(rob_id)] = row
+    state["rs"].update(frame.get("rs", {}))
+    state["registers"].update(frame.get("registers", {}))
+    for addr, value in frame.get("memory", []):
+        state["memory"][addr] = value
+    return state
+
+
+def encode_message(message):
+    return (json.dumps(message, separators=(',', ':'), default=str) + "\n").encode()
+
+
+# Le a proxima linha do stream (b"" no fim). Uma linha maior que STREAM_LIMIT
+# e descartada inteira e levanta ValueError; a conexao continua utilizavel
+async def read_line(reader):
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    try:
+        while True:
+            await reader.readexactly(consumed)
+            try:
+                await reader.readuntil(b"\n")
+                break
+            except asyncio.LimitOverrunError as e:
+                consumed = e.consumed
+    except asyncio.IncompleteReadError:
+        return b""
+    raise ValueError(f"mensagem maior que {STREAM_LIMIT} bytes descartada")
+
+
+# --- Classe ClientConnection ---
+class ClientConnection:
+    def __init__(self, reader, writer, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.reader = reader
+        self.writer = writer
+        self.frames = asyncio.Queue(maxsize=queue_size)
+        self.subscribed = False
+        self.needs_snapshot = False
+        self.dropped_frames = 0
+        # Versao do programa ja enviada a este inscrito (None: nenhuma)
+        self.program_version = None
+        self.sender = None
+
+    def send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write(encode_message(message))
+
+    # Enfileira um quadro ja codificado; com a fila cheia o quadro e descartado
+    # e o proximo quadro enviado a este inscrito sera um snapshot
+    def offer(self, data):
+        if self.needs_snapshot:
+            self.dropped_frames += 1
+            return
+        try:
+            self.frames.put_nowait(data)
+        except asyncio.QueueFull:
+            self.needs_snapshot = True
+            self.dropped_frames += 1
+
+    def resync(self, data):
+        self.frames.put_nowait(data)
+        self.needs_snapshot = False
+
+    async def send_frames(self):
+        try:
+            while True:
+                chunk = [await self.frames.get()]
+                while not self.frames.empty():
+                    chunk.append(self.frames.get_nowait())
+                self.writer.writelines(chunk)
+                await self.writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+
+# --- Classe SimulationServer ---
+class SimulationServer:
+    def __init__(self, simulator=None, queue_size=SUBSCRIBER_QUEUE_SIZE, state_dir=None):
+        self.simulator = simulator if simulator is not None else TomasuloSimulator()
+        self.queue_size = queue_size
+        # Unico diretorio de onde o comando load pode ler arquivos de estado (None desliga)
+        self.state_dir = os.path.realpath(state_dir) if state_dir else None
+        self.connections = set()
+        self.run_task = None
+        self.pause_requested = False
+        self._program_text = None
+        self._program_version = 0
+        self._rs_by_name = {}
+        self._set_simulator(self.simulator)
+
+    def _set_simulator(self, simulator):
+        self.simulator = simulator
+        self._rs_by_name = {rs.name: rs for rs in simulator.reservation_stations}
+        self._program_text = [str(inst) for inst in simulator.program_instructions]
+        self._program_version += 1
+        simulator.dirty_all = True
+
+    def _subscribers(self):
+        return [conn for conn in self.connections if conn.subscribed]
+
+    def snapshot(self, include_program=True):
+        return build_snapshot(self.simulator, self._program_text, include_program)
+
+    # Envia um snapshot ao inscrito (com o programa se ele ainda nao tem a versao atual);
+    # encoded guarda os snapshots ja codificados neste ciclo
+    def _resync(self, conn, encoded):
+        include_program = conn.program_version != self._program_version
+        if include_program not in encoded:
+            encoded[include_program] = encode_message(self.snapshot(include_program))
+        conn.resync(encoded[include_program])
+        conn.program_version = self._program_version
+
+    # Envia aos inscritos as alteracoes desde o ultimo quadro
+    def publish(self):
+        dirty_all, dirty_rob, dirty_rs, dirty_registers, dirty_memory = self.simulator.consume_dirty()
+        subscribers = self._subscribers()
+        if not subscribers:
+            return
+
+        if dirty_all:
+            for conn in subscribers:
+                conn.needs_snapshot = True
+        else:
+            data = encode_message(build_delta(self.simulator, dirty_rob, dirty_rs, dirty_registers,
+                                              dirty_memory, self._rs_by_name))
+            for conn in subscribers:
+                conn.offer(data)
+
+        encoded = {}
+        for conn in subscribers:
+            if conn.needs_snapshot and not conn.frames.full():
+                self._resync(conn, encoded)
+
+    def tick(self):
+        self.simulator.clock_tick()
+        self.publish()
+
+    # --- Comandos ---
+    # Carrega um arquivo de estado de state_dir; o arquivo e as regioes que ele mapeia
+    # precisam estar dentro do diretorio (verificado antes de abrir cada um)
+    def _load_state(self, name):
+        if self.state_dir is None:
+            raise ValueError("servidor iniciado sem --state-dir; 'state' desabilitado")
+        path = os.path.join(self.state_dir, name)
+        if not inside_directory(path, self.state_dir):
+            raise ValueError(f"arquivo de estado fora de --state-dir: {name}")
+        return InitialState.load(path, allowed_dir=self.state_dir)
+
+    def cmd_load(self, message):
+        if "file" in message:
+            raise ValueError("'file' nao e aceito; envie as linhas do programa em 'program'")
+        lines = message.get("program", [])
+        memory = {int(addr): value for addr, value in message.get("memory", {}).items()}
+
+        # Valida o estado e a configuracao antes de descartar a sessao atual
+        state = self._load_state(message["state"]) if "state" in message else None
+        simulator = self.simulator
+        if "config" in message:
+            try:
+                simulator = TomasuloSimulator(**message["config"])
+            except Exception:
+                if state is not None:
+                    state.close()
+                raise
+            simulator.initial_state = self.simulator.initial_state
+        else:
+            simulator.reset_simulator()
+        if state is not None:
+            simulator.set_initial_state(state)
+        simulator.load_program(lines)
+
+        for name, value in message.get("registers", {}).items():
+            if name not in simulator.register_file:
+                simulator.register_file[name] = Register(name)
+            simulator.register_file[name].value = value
+        for addr, value in memory.items():
+            simulator.memory[addr] = value
+
+        self._set_simulator(simulator)
+        self.publish()
+        return {"program_length": simulator.program_length, "config": simulator.config}
+
+    def cmd_snapshot(self, message):
+        return {"snapshot": self.snapshot()}
+
+    def cmd_subscribe(self, conn):
+        conn.subscribed = True
+        conn.needs_snapshot = True
+        conn.program_version = None
+        if not conn.frames.full():
+            self._resync(conn, {})
+        return {}
+
+    def cmd_unsubscribe(self, conn):
+        conn.subscribed = False
+        return {"dropped_frames": conn.dropped_frames}
+
+    def cmd_pause(self, message):
+        running = self.run_task is not None and not self.run_task.done()
+        self.pause_requested = running
+        return {"running": running}
+
+    async def run_until(self, conn, message):
+        sim = self.simulator
+        target_cycle = message.get("cycle")
+        target_pc = message.get("pc")
+        max_cycles = message.get("max_cycles")
+        self.pause_requested = False
+        reason = "finished"
+        cycles_since_yield = 0
+
+        while not sim.is_finished():
+            if self.pause_requested:
+                reason = "paused"
+                break
+            if max_cycles is not None and sim.current_cycle >= max_cycles:
+                reason = "max_cycles"
+                break
+            if target_cycle is not None and sim.current_cycle >= target_cycle:
+                reason = "cycle"
+                break
+
+            self.tick()
+            if target_pc is not None and sim.program_counter == target_pc:
+                reason = "pc"
+                break
+
+            # Com inscritos cede o loop a cada ciclo para os quadros sairem;
+            # sem inscritos simula em blocos
+            cycles_since_yield += 1
+            if cycles_since_yield >= RUN_YIELD_CYCLES or self._subscribers():
+                cycles_since_yield = 0
+                await asyncio.sleep(0)
+
+        self.pause_requested = False
+        conn.send({"type": "reply", "id": message.get("id"), "ok": True, "reason": reason,
+                   "cycle": sim.current_cycle, "finished": sim.is_finished(),
+                   "metrics": sim.get_metrics()})
+
+    def _is_running(self):
+        return self.run_task is not None and not self.run_task.done()
+
+    def dispatch(self, conn, message):
+        cmd = message.get("cmd")
+        if cmd in ("run_until", "step"):
+            if self._is_running():
+                raise RuntimeError("simulacao ja em execucao")
+            if cmd == "step":
+                # Um step longo e um run_until ate o ciclo alvo: cede o loop e aceita pause
+                cycles = int(message.get("cycles", 1))
+                message = {"id": message.get("id"), "cycle": self.simulator.current_cycle + cycles}
+            self.run_task = asyncio.ensure_future(self.run_until(conn, message))
+            return None
+        if cmd == "load" and self._is_running():
+            raise RuntimeError("simulacao em execucao; envie 'pause' antes")
+
+        if cmd == "load":
+            return self.cmd_load(message)
+        if cmd == "snapshot":
+            return self.cmd_snapshot(message)
+        if cmd == "subscribe":
+            return self.cmd_subscribe(conn)
+        if cmd == "unsubscribe":
+            return self.cmd_unsubscribe(conn)
+        if cmd == "pause":
+            return self.cmd_pause(message)
+        raise ValueError(f"comando desconhecido: {cmd}")
+
+    async def handle_connection(self, reader, writer):
+        conn = ClientConnection(reader, writer, self.queue_size)
+        conn.sender = asyncio.ensure_future(conn.send_frames())
+        self.connections.add(conn)
+        try:
+            while True:
+                try:
+                    line = await read_line(reader)
+                except ValueError as e:
+                    conn.send({"type": "reply", "id": None, "ok": False, "error": str(e)})
+                    continue
+                if not line:
+                    break
+                message = None
+                try:
+                    message = json.loads(line)
+                    reply = self.dispatch(conn, message)
+                except Exception as e:
+                    request_id = message.get("id") if isinstance(message, dict) else None
+                    conn.send({"type": "reply", "id": request_id, "ok": False, "error": str(e)})
+                    continue
+                if reply is not None:
+                    reply.update({"type": "reply", "id": message.get("id"), "ok": True})
+                    conn.send(reply)
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.discard(conn)
+            conn.sender.cancel()
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path, limit=STREAM_LIMIT)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=STREAM_LIMIT)
+        async with server:
+            await server.serve_forever()
+
+
+# --- Classe SimulationClient ---
+# Cliente local: envia comandos, aguarda as respostas e mantem em "state" uma
+# copia do estado do simulador reconstruida a partir dos quadros recebidos.
+class SimulationClient:
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.state = None
+        self.frames = asyncio.Queue()
+        self.frames_received = 0
+        self.snapshots_received = 0
+        # Mensagens invalidas ou maiores que STREAM_LIMIT, descartadas
+        self.discarded_messages = 0
+        self._pending = {}
+        self._next_id = 0
+        self._reader_task = None
+
+    async def connect(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        if unix_path:
+            self.reader, self.writer = await asyncio.open_unix_connection(unix_path, limit=STREAM_LIMIT)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port, limit=STREAM_LIMIT)
+        self._reader_task = asyncio.ensure_future(self._read_messages())
+        return self
+
+    async def _read_messages(self):
+        try:
+            while True:
+                try:
+                    line = await read_line(self.reader)
+                    if not line:
+                        break
+                    message = json.loads(line)
+                except ValueError:
+                    # Um quadro perdido invalida a copia local ate o proximo snapshot
+                    self.discarded_messages += 1
+                    self.state = None
+                    continue
+                if message.get("type") == "reply":
+                    future = self._pending.pop(message.get("id"), None)
+                    if future is not None and not future.done():
+                        future.set_result(message)
+                    continue
+                self.frames_received += 1
+                if message["type"] == "snapshot":
+                    self.snapshots_received += 1
+                self.state = apply_frame(self.state, message)
+                self.frames.put_nowait(message)
+        except ConnectionError:
+            pass
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("conexao encerrada"))
+            self._pending.clear()
+
+    async def request(self, cmd, **params):
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        message = dict(params, cmd=cmd, id=request_id)
+        self.writer.write(encode_message(message))
+        await self.writer.drain()
+        reply = await future
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error"))
+        return reply
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+        if self._reader_task is not None:
+            await self._reader_task
+
+
+async def _watch(args):
+    client = await SimulationClient().connect(args.host, args.port, args.unix)
+    await client.request("subscribe")
+    if args.load:
+        # O arquivo e lido aqui: cliente e servidor podem estar em maquinas diferentes
+        with open(args.load, 'r') as f:
+            await client.request("load", program=f.read().splitlines())
+    if args.run:
+        reply = await client.request("run_until")
+        print(f"Parou em {reply['reason']} no ciclo {reply['cycle']}: {reply['metrics']}")
+    else:
+        while True:
+            frame = await client.frames.get()
+            changed = [key for key in ("rob", "rs", "registers", "memory") if key in frame]
+            print(f"[{frame['type']}] ciclo {frame['cycle']} PC {frame['pc']} {' '.join(changed)}")
+    print(f"Quadros recebidos: {client.frames_received} (snapshots: {client.snapshots_received})")
+    await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de simulacao Tomasulo (JSON por linha)")
+    parser.add_argument("mode", choices=["serve", "watch"],
+                        help="serve: inicia o servidor; watch: conecta e acompanha a simulacao")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="caminho de um socket Unix (em vez de TCP)")
+    parser.add_argument("--queue-size", type=int, default=SUBSCRIBER_QUEUE_SIZE,
+                        help="quadros pendentes por inscrito antes de descartar")
+    parser.add_argument("--load", help="(watch) arquivo de instrucoes a carregar no servidor")
+    parser.add_argument("--run", action="store_true", help="(watch) executa ate o fim e sai")
+    parser.add_argument("--state", help=f"(serve) arquivo de estado inicial (padrao {DEFAULT_STATE_FILE})")
+    parser.add_argument("--state-dir", help="(serve) diretorio de onde o comando load pode ler arquivos de estado")
+    args = parser.parse_args()
+
+    try:
+        if args.mode == "serve":
+            simulator = TomasuloSimulator()
+            try:
+                simulator.set_initial_state(args.state or create_default_state_file())
+            except (OSError, ValueError) as e:
+                parser.error(str(e))
+            server = SimulationServer(simulator, queue_size=args.queue_size, state_dir=args.state_dir)
+            asyncio.run(server.serve(args.host, args.port, args.unix))
+        else:
+            asyncio.run(_watch(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,59 @@
+import argparse
+import bisect
 import collections
+from array import array
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
+from tkinter import ttk, messagebox
 import os
+import time
+
+from tomasulo_state import SimulatorMemory, DEFAULT_STATE_FILE, create_default_state_file, load_state
 
 # Constantes globais para estados e tipos de branch
 JUMP = "JUMP"
 PREDICT_NOT_TAKEN = "NOT_TAKEN"
 PREDICT_TAKEN = "TAKEN"
 
+# Quantidade de enderecos mantidos no historico de escritas recentes
+RECENT_WRITES_LIMIT = 256
+
+# Estados do ROB em que o resultado ja foi calculado (fontes da rede de bypass)
+COMPLETED_STATES = ("Ready to Write", "Write Result", "Commit")
+
+# Latencias padrao (ciclos de execucao) por opcode
+DEFAULT_LATENCIES = {
+    'ADD': 2, 'SUB': 2,
+    'SLLI': 1, 'SRLI': 1, 'OR': 1, 'AND': 1, 'BEQ': 1, 'BNE': 1,
+    'LW': 5, 'LB': 5, 'SW': 5, 'SB': 5,
+    'MUL': 3, 'DIV': 3,
+}
+
+# Classes de estacao de reserva (na ordem de _create_reservation_stations)
+# e a classe que executa cada opcode
+UNIT_CLASSES = ['MEM', 'ADD', 'BRANCH', 'MUL']
+UNIT_OF_OPCODE = {
+    'LW': 0, 'LB': 0, 'SW': 0, 'SB': 0,
+    'ADD': 1, 'SUB': 1,
+    'SLLI': 2, 'SRLI': 2, 'OR': 2, 'AND': 2, 'BEQ': 2, 'BNE': 2,
+    'MUL': 3, 'DIV': 3,
+}
+
+# Arquivo de instrucoes padrao (criado com um exemplo pela GUI se nao existir)
+DEFAULT_PROGRAM_FILE = "instructions.txt"
+
 # --- Classe Instruction ---
 class Instruction:
-    def __init__(self, op, rs1, rs2=None, rd=None, shamt=None, imn=None):
+    def __init__(self, op, rs1, rs2=None, rd=None, shamt=None, imn=None, latency=None):
         self.opname = op
         self.destination = rd
         self.source1 = rs1
         self.source2 = rs2
         self.immediate = shamt
         self.address = imn
-        
-        # Atributos de estado do pipeline
-        self.execution_cycles_remaining = self._get_execution_cycles(op)
-        self.ready_to_write = False
-        self.issue_cycle = -1
-        self.execute_start_cycle = -1
-        self.write_result_cycle = -1
-        self.commit_cycle = -1
-        self.state_at_cycle = {}
+        self.latency = latency if latency is not None else self._get_execution_cycles(op)
 
     def _get_execution_cycles(self, opname):
-        if opname in ['ADD', 'SUB']: return 2
-        elif opname in ['SLLI', 'SRLI', 'OR', 'AND', 'BEQ', 'BNE']: return 1
-        elif opname in ['LW', 'LB', 'SW', 'SB']: return 5
-        elif opname in ['MUL', 'DIV']: return 3
-        else: return 1
-
-    # Reseta os atributos de estado do pipeline para re-execução
-    def reset_pipeline_state(self):
-        self.execution_cycles_remaining = self._get_execution_cycles(self.opname)
-        self.ready_to_write = False
-        self.issue_cycle = -1
-        self.execute_start_cycle = -1
-        self.write_result_cycle = -1
-        self.commit_cycle = -1
-        self.state_at_cycle = {}
+        return DEFAULT_LATENCIES.get(opname, 1)
 
     def __str__(self):
         if self.opname in ['SLLI', 'SRLI']:
@@ -59,6 +70,213 @@ class Instruction:
             return f'{self.opname} {self.destination}, {self.source1}, {self.source2}'
 
 
+# --- Classe DynamicInstruction ---
+# Instancia dinamica de uma Instruction (uma por emissao). Guarda o estado do
+# pipeline, de modo que a mesma instrucao estatica pode estar no ROB mais de
+# uma vez. As instancias vem de um InstructionPool e sao recicladas.
+class DynamicInstruction:
+    __slots__ = ('pool', 'static', 'static_index', 'sequence_number',
+                 'opname', 'destination', 'source1', 'source2', 'immediate', 'address',
+                 'execution_cycles_remaining', 'ready_to_write', 'issue_cycle',
+                 'execute_start_cycle', 'complete_cycle', 'write_result_cycle', 'commit_cycle', 'state_at_cycle')
+
+    def __init__(self, pool=None):
+        self.pool = pool
+        self.static = None
+        self.static_index = -1
+        self.sequence_number = -1
+        self.state_at_cycle = {}
+        self.bind(None, -1, -1)
+
+    # Associa a instancia a uma instrucao estatica e reseta o estado do pipeline
+    def bind(self, static, static_index, sequence_number):
+        self.static = static
+        self.static_index = static_index
+        self.sequence_number = sequence_number
+        if static is not None:
+            self.opname = static.opname
+            self.destination = static.destination
+            self.source1 = static.source1
+            self.source2 = static.source2
+            self.immediate = static.immediate
+            self.address = static.address
+            self.execution_cycles_remaining = static.latency
+        else:
+            self.opname = self.destination = self.source1 = self.source2 = None
+            self.immediate = self.address = None
+            self.execution_cycles_remaining = 0
+        self.ready_to_write = False
+        self.issue_cycle = -1
+        self.execute_start_cycle = -1
+        self.complete_cycle = -1
+        self.write_result_cycle = -1
+        self.commit_cycle = -1
+        self.state_at_cycle.clear()
+
+    # Devolve a instancia ao pool de origem
+    def release(self):
+        if self.pool is not None:
+            self.pool.release(self)
+
+    def __str__(self):
+        return str(self.static)
+
+
+# --- Classe InstructionPool ---
+# Pool de DynamicInstruction dimensionado pelo ROB: emitir uma instrucao nao aloca objetos novos.
+class InstructionPool:
+    def __init__(self, size):
+        self.size = size
+        self.free = [DynamicInstruction(self) for _ in range(size)]
+        self.next_sequence_number = 0
+
+    def acquire(self, static, static_index):
+        inst = self.free.pop() if self.free else DynamicInstruction(self)
+        inst.bind(static, static_index, self.next_sequence_number)
+        self.next_sequence_number += 1
+        return inst
+
+    def release(self, inst):
+        inst.bind(None, -1, -1)
+        self.free.append(inst)
+
+    def reset(self):
+        self.next_sequence_number = 0
+
+
+# Campos registrados para cada instrucao confirmada, na ordem das colunas do RetireLog
+RETIRE_LOG_FIELDS = ('static_index', 'issue_cycle', 'execute_start_cycle', 'complete_cycle',
+                     'write_result_cycle', 'commit_cycle', 'retire_cycle')
+
+# --- Classe RetireLog ---
+# Ciclos de cada instrucao confirmada, guardados em colunas preallocadas de
+# inteiros de 64 bits (a capacidade dobra quando enche). Os dados sao copiados
+# na confirmacao, antes da DynamicInstruction voltar ao pool.
+class RetireLog:
+    def __init__(self, capacity=4096):
+        self.count = 0
+        self.capacity = 0
+        self.columns = {name: array('q') for name in RETIRE_LOG_FIELDS}
+        self._column_list = [self.columns[name] for name in RETIRE_LOG_FIELDS]
+        self._grow(max(capacity, 1))
+
+    def _grow(self, capacity):
+        extra = bytes(8 * (capacity - self.capacity))
+        for column in self._column_list:
+            column.frombytes(extra)
+        self.capacity = capacity
+
+    def record(self, inst, retire_cycle):
+        i = self.count
+        if i == self.capacity:
+            self._grow(2 * self.capacity)
+        values = (inst.static_index, inst.issue_cycle, inst.execute_start_cycle, inst.complete_cycle,
+                  inst.write_result_cycle, inst.commit_cycle, retire_cycle)
+        for column, value in zip(self._column_list, values):
+            column[i] = value
+        self.count = i + 1
+
+    def clear(self):
+        self.count = 0
+
+
+# Converte uma linha de texto em Instruction (None para comentarios/linhas invalidas)
+def parse_instruction(line):
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+
+    tokens = [t.strip(',') for t in line.split()]
+    opname = tokens[0]
+
+    destination = None
+    source1 = None
+    source2 = None
+    immediate = None
+    address = None
+
+    if opname in ['SLLI', 'SRLI']:
+        destination = tokens[1]
+        source1 = tokens[2]
+        immediate = int(tokens[3])
+    elif opname in ['LW', 'LB']: 
+        destination = tokens[1]
+        source1 = tokens[2]
+        address = int(tokens[3])
+    elif opname in ['SW', 'SB']: 
+        source2 = tokens[1]
+        source1 = tokens[2]
+        address = int(tokens[3])
+    elif opname in ['BEQ', 'BNE']: 
+        source1 = tokens[1]
+        source2 = tokens[2]
+        address = int(tokens[3])
+    elif opname in ['ADD', 'SUB', 'OR', 'AND', 'MUL', 'DIV']:
+        destination = tokens[1]
+        source1 = tokens[2]
+        source2 = tokens[3]
+    else:
+        print(f"Warning: Instrução '{opname}' não reconhecida na linha: {line}. Ignorando.")
+        return None
+
+    return Instruction(opname, source1, source2, destination, immediate, address)
+
+# Converte um programa (lista de linhas) em lista de Instruction
+def parse_program(lines):
+    program = []
+    for line in lines:
+        instruction = parse_instruction(line)
+        if instruction is not None:
+            program.append(instruction)
+    return program
+
+
+# Secoes medidas pelo StageProfiler a cada ciclo, na ordem de clock_tick
+PROFILE_STAGES = ("commit_stage", "write_result_stage", "execute_stage", "issue_stage", "bookkeeping")
+
+# --- Classe StageProfiler ---
+# Acumula tempo de parede (time.perf_counter) e numero de chamadas por estagio
+# do simulador; "bookkeeping" e a contagem de bolhas e o historico
+# state_at_cycle do fim de clock_tick. Outras secoes (ex.: update_gui) entram via add().
+class StageProfiler:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.times = dict.fromkeys(PROFILE_STAGES, 0.0)
+        self.calls = {}
+        self.cycles = 0
+        self.started = time.perf_counter()
+
+    def record_cycle(self, *elapsed):
+        times = self.times
+        for stage, seconds in zip(PROFILE_STAGES, elapsed):
+            times[stage] += seconds
+        self.cycles += 1
+
+    def add(self, section, seconds):
+        self.times[section] = self.times.get(section, 0.0) + seconds
+        self.calls[section] = self.calls.get(section, 0) + 1
+
+    def report(self):
+        wall = time.perf_counter() - self.started
+        simulation_time = sum(self.times[stage] for stage in PROFILE_STAGES)
+        total = sum(self.times.values())
+
+        lines = [f"Perfil de execucao: {self.cycles} ciclos em {wall:.3f}s de parede",
+                 f"  {'secao':<20}{'chamadas':>10}{'total (s)':>12}{'media (us)':>12}{'%':>7}"]
+        for section, seconds in sorted(self.times.items(), key=lambda item: -item[1]):
+            calls = self.cycles if section in PROFILE_STAGES else self.calls[section]
+            mean = seconds / calls * 1e6 if calls else 0.0
+            share = seconds / total * 100 if total else 0.0
+            lines.append(f"  {section:<20}{calls:>10}{seconds:>12.4f}{mean:>12.2f}{share:>7.1f}")
+        if simulation_time > 0:
+            lines.append(f"Ciclos por segundo (so simulacao): {self.cycles / simulation_time:,.0f}")
+        if wall > 0:
+            lines.append(f"Ciclos por segundo (parede): {self.cycles / wall:,.0f}")
+        return "\n".join(lines)
+
+
 # --- Classe Register ---
 class Register:
     def __init__(self, name):
@@ -95,7 +313,7 @@ class ReorderBufferPos:
     def clear(self):
         self.busy = False
         if self.instruction:
-            self.instruction.reset_pipeline_state()
+            self.instruction.release()
         self.instruction = None
         self.state = ""
         self.destination_reg = ""
@@ -144,16 +362,37 @@ class ReservationStation:
 
 # --- Classe TomasuloSimulator ---
 class TomasuloSimulator:
-    def __init__(self, num_mem_rs=2, num_add_rs=3, num_logic_rs=2, num_mult_rs=1, rob_size=8):
+    def __init__(self, num_mem_rs=2, num_add_rs=3, num_logic_rs=2, num_mult_rs=1, rob_size=8, latencies=None,
+                 bypass_issue=False, bypass_wakeup=False):
+        # Parametros de construcao (usados como chave do cache de resultados)
+        self.config = {
+            "num_mem_rs": num_mem_rs, "num_add_rs": num_add_rs, "num_logic_rs": num_logic_rs,
+            "num_mult_rs": num_mult_rs, "rob_size": rob_size,
+            "bypass_issue": bypass_issue, "bypass_wakeup": bypass_wakeup,
+        }
+        # Rede de bypass:
+        # bypass_issue: a emissao le o valor de qualquer entrada do ROB ja calculada
+        #   (Ready to Write, Write Result ou Commit), nao so das que estao em Write Result
+        # bypass_wakeup: estacoes aguardando um resultado ja calculado (ainda sem vez
+        #   no CDB) recebem o valor direto da saida da UF e podem iniciar a execucao
+        self.bypass_issue = bypass_issue
+        self.bypass_wakeup = bypass_wakeup
+        self.latencies = dict(DEFAULT_LATENCIES)
+        if latencies:
+            self.latencies.update(latencies)
+
         self.register_file = {}
-        self.memory = collections.defaultdict(int)
+        self.memory = SimulatorMemory()
         self.program_counter = 0
         self.program_length = 0
+        # Imagem de estado inicial (InitialState) aplicada a cada carga de programa
+        self.initial_state = None
 
         self.reservation_stations = []
         self._create_reservation_stations(num_mem_rs, num_add_rs, num_logic_rs, num_mult_rs)
 
         self.reorder_buffer = [ReorderBufferPos(i, None, None, None) for i in range(rob_size)]
+        self.instruction_pool = InstructionPool(rob_size)
         self.rob_head = 0
         self.rob_tail = 0
         self.current_rob_entries = 0
@@ -161,10 +400,27 @@ class TomasuloSimulator:
         self.current_cycle = 0
         self.committed_instructions_count = 0
         self.bubble_cycles = 0
+        self.mispredictions = 0
+        self.bypassed_operands = 0
 
         self.is_running = False
         self.program_instructions = []
 
+        # Registro de latencias por instrucao confirmada (desligado por padrao, ver enable_retire_log)
+        self.retire_log = None
+        # Tempo de host por estagio (desligado por padrao, ver enable_profiling)
+        self.profiler = None
+
+        # Elementos alterados desde a ultima consulta (usado pela GUI para redesenhar so o necessario)
+        self.dirty_rob = set()
+        self.dirty_rs = set()
+        self.dirty_registers = set()
+        self.dirty_memory = set()
+        self.dirty_all = True
+
+        # Enderecos escritos mais recentemente (endereco -> ciclo), do mais antigo ao mais novo
+        self.recent_memory_writes = collections.OrderedDict()
+
     def _create_reservation_stations(self, num_mem, num_add, num_logic, num_mult):
         for i in range(num_mem):
             self.reservation_stations.append(ReservationStation(f"MEM{i+1}"))
@@ -175,75 +431,79 @@ class TomasuloSimulator:
         for i in range(num_mult):
             self.reservation_stations.append(ReservationStation(f"MUL{i+1}")) 
 
-    def load_instructions(self, filename="instructions.txt"):
+    def load_instructions(self, filename=DEFAULT_PROGRAM_FILE):
         self.program_instructions.clear()
         self.register_file.clear()
-        self.memory = collections.defaultdict(int)
+        self.memory = SimulatorMemory()
         self.program_length = 0
 
         try:
             with open(filename, 'r') as f:
-                for line in f.readlines():
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-
-                    tokens = [t.strip(',') for t in line.split()]
-                    opname = tokens[0]
-
-                    instruction = None
-                    destination = None
-                    source1 = None
-                    source2 = None
-                    immediate = None
-                    address = None
-                    inst_type = "ALU"
-
-                    if opname in ['SLLI', 'SRLI']:
-                        destination = tokens[1]
-                        source1 = tokens[2]
-                        immediate = int(tokens[3])
-                    elif opname in ['LW', 'LB']: 
-                        destination = tokens[1]
-                        source1 = tokens[2]
-                        address = int(tokens[3])
-                        inst_type = "LOAD"
-                    elif opname in ['SW', 'SB']: 
-                        source2 = tokens[1]
-                        source1 = tokens[2]
-                        address = int(tokens[3])
-                        inst_type = "STORE"
-                    elif opname in ['BEQ', 'BNE']: 
-                        source1 = tokens[1]
-                        source2 = tokens[2]
-                        address = int(tokens[3])
-                        inst_type = "BRANCH"
-                    elif opname in ['ADD', 'SUB', 'OR', 'AND', 'MUL', 'DIV']:
-                        destination = tokens[1]
-                        source1 = tokens[2]
-                        source2 = tokens[3]
-                        inst_type = "ALU"
-                    else:
-                        print(f"Warning: Instrução '{opname}' não reconhecida na linha: {line}. Ignorando.")
-                        continue
-
-                    instruction = Instruction(opname, source1, source2, destination, immediate, address)
-                    self.program_instructions.append(instruction)
-
-                    regs_to_check = []
-                    if destination: regs_to_check.append(destination)
-                    if source1: regs_to_check.append(source1)
-                    if source2: regs_to_check.append(source2)
-
-                    for reg_name in regs_to_check:
-                        if reg_name and reg_name not in self.register_file:
-                            self.register_file[reg_name] = Register(reg_name)
-            self.program_length = len(self.program_instructions)
+                self.load_program(f.readlines())
         except FileNotFoundError:
             messagebox.showerror("Erro de Carregamento", f"O arquivo de instruções '{filename}' não foi encontrado.")
             return False
         return True
 
+    # Carrega o programa a partir de linhas de texto (sem interface grafica)
+    def load_program(self, lines):
+        self.program_instructions.clear()
+        self.register_file.clear()
+        self.memory = SimulatorMemory()
+
+        for instruction in parse_program(lines):
+            instruction.latency = self.latencies.get(instruction.opname, instruction.latency)
+            self.program_instructions.append(instruction)
+
+            for reg_name in (instruction.destination, instruction.source1, instruction.source2):
+                if reg_name and reg_name not in self.register_file:
+                    self.register_file[reg_name] = Register(reg_name)
+        self.program_length = len(self.program_instructions)
+        self._apply_initial_state()
+        if self.retire_log is not None:
+            self.retire_log.clear()
+        self.dirty_all = True
+
+    # Define a imagem de estado inicial (InitialState ou caminho do arquivo; None desliga).
+    # Vale a partir da proxima carga de programa; a imagem anterior e fechada
+    def set_initial_state(self, state):
+        state = load_state(state)
+        if self.initial_state is not None and self.initial_state is not state:
+            self.initial_state.close()
+        self.initial_state = state
+        return self.initial_state
+
+    # Le de novo o arquivo da imagem atual (registradores, MEM e regioes)
+    def reload_initial_state(self):
+        if self.initial_state is not None and self.initial_state.filename is not None:
+            self.set_initial_state(self.initial_state.filename)
+
+    # Libera as regioes mapeadas da imagem de estado inicial
+    def close(self):
+        self.set_initial_state(None)
+
+    def _apply_initial_state(self):
+        state = self.initial_state
+        if state is None:
+            return
+        for name, value in state.registers.items():
+            if name not in self.register_file:
+                self.register_file[name] = Register(name)
+            self.register_file[name].value = value
+        self.memory = state.build_memory()
+
+    # Passa a registrar os ciclos de cada instrucao confirmada em self.retire_log
+    def enable_retire_log(self, capacity=4096):
+        if self.retire_log is None:
+            self.retire_log = RetireLog(capacity)
+        return self.retire_log
+
+    # Passa a medir o tempo de host gasto em cada estagio (e na GUI)
+    def enable_profiling(self):
+        if self.profiler is None:
+            self.profiler = StageProfiler()
+        return self.profiler
+
     def _get_free_rob_entry(self):
         if self.reorder_buffer[self.rob_tail].busy:
             return -1 
@@ -266,12 +526,17 @@ class TomasuloSimulator:
     def issue_stage(self):
         issued_this_cycle = False
         if self.program_counter < self.program_length:
-            inst_to_issue = self.program_instructions[self.program_counter]
+            static_inst = self.program_instructions[self.program_counter]
             
             rob_id = self._get_free_rob_entry()
-            rs_entry = self._get_free_rs(inst_to_issue.opname)
+            rs_entry = self._get_free_rs(static_inst.opname)
 
             if rob_id != -1 and rs_entry is not None:
+                inst_to_issue = self.instruction_pool.acquire(static_inst, self.program_counter)
+
+                self.dirty_rob.add(rob_id)
+                self.dirty_rs.add(rs_entry.name)
+
                 # Aloca entrada no ROB
                 rob_pos = self.reorder_buffer[rob_id]
                 rob_pos.busy = True 
@@ -314,45 +579,19 @@ class TomasuloSimulator:
 
                 # Trata os operandos (Vj, Vk, Qj, Qk) para a RS
                 if inst_to_issue.source1:
-                    reg1 = self.register_file[inst_to_issue.source1]
-                    if reg1.busy and reg1.reorder_tag is not None:
-                        rob_entry_src1 = self.reorder_buffer[reg1.reorder_tag]
-                        if rob_entry_src1.state == "Write Result" and rob_entry_src1.value is not None:
-                            rs_entry.Vj = rob_entry_src1.value 
-                        else:
-                            rs_entry.Qj = reg1.reorder_tag
-                    else:
-                        rs_entry.Vj = reg1.value
+                    rs_entry.Vj, rs_entry.Qj = self._read_operand(inst_to_issue.source1)
                 
                 if inst_to_issue.opname in ['SLLI', 'SRLI']:
                     rs_entry.Vk = inst_to_issue.immediate
-                elif inst_to_issue.opname in ['SW', 'SB']:
-                    if inst_to_issue.source2:
-                        reg2 = self.register_file[inst_to_issue.source2]
-                        if reg2.busy and reg2.reorder_tag is not None:
-                            rob_entry_src2 = self.reorder_buffer[reg2.reorder_tag]
-                            if rob_entry_src2.state == "Write Result" and rob_entry_src2.value is not None:
-                                rs_entry.Vk = rob_entry_src2.value
-                            else:
-                                rs_entry.Qk = reg2.reorder_tag
-                        else:
-                            rs_entry.Vk = reg2.value
                 elif inst_to_issue.source2:
-                    reg2 = self.register_file[inst_to_issue.source2]
-                    if reg2.busy and reg2.reorder_tag is not None:
-                        rob_entry_src2 = self.reorder_buffer[reg2.reorder_tag]
-                        if rob_entry_src2.state == "Write Result" and rob_entry_src2.value is not None:
-                            rs_entry.Vk = rob_entry_src2.value
-                        else:
-                            rs_entry.Qk = reg2.reorder_tag
-                    else:
-                        rs_entry.Vk = reg2.value
+                    rs_entry.Vk, rs_entry.Qk = self._read_operand(inst_to_issue.source2)
 
                 # Atualiza o Register File para renomeação de destino
                 if inst_to_issue.destination and inst_to_issue.opname not in ['SW', 'SB', 'BEQ', 'BNE']:
                     dest_reg = self.register_file[inst_to_issue.destination]
                     dest_reg.busy = True
                     dest_reg.reorder_tag = rob_id
+                    self._mark_register_dirty(inst_to_issue.destination)
 
                 # Avança o Program Counter e a cauda do ROB
                 self.program_counter += 1
@@ -361,6 +600,27 @@ class TomasuloSimulator:
                 issued_this_cycle = True
         return issued_this_cycle
 
+    # Le um operando fonte na emissao: (valor, None) se disponivel ou (None, tag do ROB produtor)
+    def _read_operand(self, reg_name):
+        reg = self.register_file[reg_name]
+        if not (reg.busy and reg.reorder_tag is not None):
+            return reg.value, None
+        producer = self.reorder_buffer[reg.reorder_tag]
+        if producer.value is not None:
+            if producer.state == "Write Result":
+                return producer.value, None
+            if self.bypass_issue and producer.state in COMPLETED_STATES:
+                self.bypassed_operands += 1
+                return producer.value, None
+        return None, reg.reorder_tag
+
+    # Valor de uma entrada do ROB ja calculada (ou None), para o bypass na execucao
+    def _bypass_value(self, rob_id):
+        producer = self.reorder_buffer[rob_id]
+        if producer.busy and producer.state in COMPLETED_STATES:
+            return producer.value
+        return None
+
     # --- Estágio de Execução (Execute) ---
     def execute_stage(self):
         # Controla se uma UF ja iniciou execucao neste ciclo.
@@ -378,9 +638,26 @@ class TomasuloSimulator:
                 # Se o ROB ID não é válido ou a entrada não está busy, a RS é inconsistente e deve ser limpa.
                 if rob_entry_id is None or not self.reorder_buffer[rob_entry_id].busy:
                     rs.clear() 
+                    self.dirty_rs.add(rs.name)
                     continue 
                 rs_to_process.append(rs)
 
+        # Bypass: resultados ja calculados que ainda aguardam o CDB acordam as estacoes dependentes
+        if self.bypass_wakeup:
+            for rs in rs_to_process:
+                if rs.Qj is not None:
+                    value = self._bypass_value(rs.Qj)
+                    if value is not None:
+                        rs.Vj, rs.Qj = value, None
+                        self.bypassed_operands += 1
+                        self.dirty_rs.add(rs.name)
+                if rs.Qk is not None:
+                    value = self._bypass_value(rs.Qk)
+                    if value is not None:
+                        rs.Vk, rs.Qk = value, None
+                        self.bypassed_operands += 1
+                        self.dirty_rs.add(rs.name)
+
         ready_to_start_exec = []
         already_executing = []
 
@@ -401,7 +678,9 @@ class TomasuloSimulator:
 
             if inst_obj.execution_cycles_remaining == 0:
                 inst_obj.ready_to_write = True
+                inst_obj.complete_cycle = self.current_cycle
                 rob_entry.state = "Ready to Write"
+                self.dirty_rob.add(rs.destination_rob_id)
 
                 # Calcula o resultado quando a execução finaliza
                 result = None
@@ -428,13 +707,14 @@ class TomasuloSimulator:
                     base_val = rs.Vj if rs.Vj is not None else 0
                     offset = inst_obj.address
                     effective_address = base_val + offset
-                    result = self.memory[effective_address]
+                    result = self.memory.get(effective_address, 0)
                 elif inst_obj.opname in ['SW', 'SB']:
                     base_reg_value = rs.Vj 
                     value_to_be_stored = rs.Vk 
                     offset = inst_obj.address 
                     effective_address = base_reg_value + offset
                     self.memory[effective_address] = value_to_be_stored
+                    self._record_memory_write(effective_address)
                     result = "MEM_STORED"
                 elif inst_obj.opname in ['BEQ', 'BNE']:
                     val1 = rs.Vj if rs.Vj is not None else 0
@@ -463,11 +743,13 @@ class TomasuloSimulator:
 
                 inst_obj.execute_start_cycle = self.current_cycle
                 rob_entry.state = "Executing"
+                self.dirty_rob.add(rs.destination_rob_id)
                 
                 inst_obj.execution_cycles_remaining -= 1
 
                 if inst_obj.execution_cycles_remaining == 0:
                     inst_obj.ready_to_write = True
+                    inst_obj.complete_cycle = self.current_cycle
                     rob_entry.state = "Ready to Write"
 
                     # Calcula o resultado (se a execução é de 1 ciclo)
@@ -495,13 +777,14 @@ class TomasuloSimulator:
                         base_val = rs.Vj if rs.Vj is not None else 0
                         offset = inst_obj.address
                         effective_address = base_val + offset
-                        result = self.memory[effective_address]
+                        result = self.memory.get(effective_address, 0)
                     elif inst_obj.opname in ['SW', 'SB']:
                         base_reg_value = rs.Vj 
                         value_to_be_stored = rs.Vk 
                         offset = inst_obj.address 
                         effective_address = base_reg_value + offset
                         self.memory[effective_address] = value_to_be_stored
+                        self._record_memory_write(effective_address)
                         result = "MEM_STORED"
                     elif inst_obj.opname in ['BEQ', 'BNE']:
                         val1 = rs.Vj if rs.Vj is not None else 0
@@ -529,19 +812,23 @@ class TomasuloSimulator:
             
             inst_obj.write_result_cycle = self.current_cycle
             rob_entry_to_broadcast.state = "Write Result" 
+            self.dirty_rob.add(rob_id_to_broadcast)
 
             for rs in self.reservation_stations:
                 if rs.busy:
                     if rs.Qj == rob_id_to_broadcast:
                         rs.Vj = result_value
                         rs.Qj = None
+                        self.dirty_rs.add(rs.name)
                     if rs.Qk == rob_id_to_broadcast:
                         rs.Vk = result_value
                         rs.Qk = None
+                        self.dirty_rs.add(rs.name)
             
             if rob_entry_to_broadcast.source_rs and rob_entry_to_broadcast.source_rs.busy:
                 if rob_entry_to_broadcast.source_rs.destination_rob_id == rob_id_to_broadcast:
                     rob_entry_to_broadcast.source_rs.clear()
+                    self.dirty_rs.add(rob_entry_to_broadcast.source_rs.name)
 
     # --- Estágio de Confirmação (Commit) ---
     def commit_stage(self):
@@ -552,11 +839,15 @@ class TomasuloSimulator:
         if head_rob_entry.busy and head_rob_entry.state == "Write Result" and (head_rob_entry.instruction and head_rob_entry.instruction.commit_cycle == -1):
             head_rob_entry.state = "Commit" 
             head_rob_entry.instruction.commit_cycle = self.current_cycle
+            self.dirty_rob.add(head_rob_entry.id)
             committed_this_cycle = True
         
         # Condição para remover a instrução do ROB (após ter passado pelo estado "Commit")
         elif head_rob_entry.busy and head_rob_entry.state == "Commit" and (head_rob_entry.instruction and head_rob_entry.instruction.commit_cycle == self.current_cycle -1): 
             inst_obj = head_rob_entry.instruction
+            self.dirty_rob.add(head_rob_entry.id)
+            if self.retire_log is not None:
+                self.retire_log.record(inst_obj, self.current_cycle)
             
             if head_rob_entry.inst_type == "BRANCH":
                 predicted = head_rob_entry.predicted_taken
@@ -564,6 +855,7 @@ class TomasuloSimulator:
 
                 if predicted != actual: # Misprediction
                     print(f"!!! Misprediction de Branch em ROB ID {head_rob_entry.id} (Inst: {inst_obj})!")
+                    self.mispredictions += 1
                     
                     # Correct PC
                     if actual == PREDICT_TAKEN:
@@ -571,6 +863,8 @@ class TomasuloSimulator:
                     else:
                         self.program_counter = head_rob_entry.program_order_index + 1 
                     
+                    self.dirty_all = True
+
                     # Identificar e limpar instruções especulativas subsequentes no ROB
                     rob_entries_to_clear_ids = []
                     temp_idx = (self.rob_head + 1) % len(self.reorder_buffer)
@@ -634,6 +928,7 @@ class TomasuloSimulator:
                     if reg.reorder_tag == head_rob_entry.id:
                         reg.value = head_rob_entry.value 
                         reg.clear() 
+                        self._mark_register_dirty(dest_reg_name)
                 head_rob_entry.clear()
                 self.rob_head = (self.rob_head + 1) % len(self.reorder_buffer)
                 self.committed_instructions_count += 1
@@ -644,6 +939,10 @@ class TomasuloSimulator:
 
     # Avanca o simulador em um ciclo de clock
     def clock_tick(self):
+        if self.profiler is not None:
+            self._clock_tick_profiled()
+            return
+
         self.current_cycle += 1
 
         # Ordem de execução dos estágios
@@ -652,6 +951,27 @@ class TomasuloSimulator:
         self.execute_stage()
         issued = self.issue_stage()
 
+        self._finish_cycle(issued, committed)
+
+    # Mesmo ciclo de clock_tick, medindo o tempo de cada estagio
+    def _clock_tick_profiled(self):
+        clock = time.perf_counter
+        t0 = clock()
+        self.current_cycle += 1
+        committed = self.commit_stage()
+        t1 = clock()
+        self.write_result_stage()
+        t2 = clock()
+        self.execute_stage()
+        t3 = clock()
+        issued = self.issue_stage()
+        t4 = clock()
+        self._finish_cycle(issued, committed)
+        t5 = clock()
+        self.profiler.record_cycle(t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)
+
+    # Contagem de bolhas e historico de estados por ciclo
+    def _finish_cycle(self, issued, committed):
         if not issued and not committed and not self.is_finished():
             self.bubble_cycles += 1
         
@@ -659,6 +979,34 @@ class TomasuloSimulator:
             if entry.busy and entry.instruction:
                 entry.instruction.state_at_cycle[self.current_cycle] = entry.state
 
+    # Executa ate o fim do programa (ou ate max_cycles) e retorna as metricas
+    def run(self, max_cycles=None):
+        while not self.is_finished():
+            if max_cycles is not None and self.current_cycle >= max_cycles:
+                break
+            self.clock_tick()
+        return self.get_metrics()
+
+    def _mark_register_dirty(self, name):
+        self.dirty_registers.add(name)
+
+    def _record_memory_write(self, address):
+        self.dirty_memory.add(address)
+        self.recent_memory_writes[address] = self.current_cycle
+        self.recent_memory_writes.move_to_end(address)
+        if len(self.recent_memory_writes) > RECENT_WRITES_LIMIT:
+            self.recent_memory_writes.popitem(last=False)
+
+    # Retorna e limpa os conjuntos de elementos alterados desde a ultima chamada
+    def consume_dirty(self):
+        dirty = (self.dirty_all, self.dirty_rob, self.dirty_rs, self.dirty_registers, self.dirty_memory)
+        self.dirty_all = False
+        self.dirty_rob = set()
+        self.dirty_rs = set()
+        self.dirty_registers = set()
+        self.dirty_memory = set()
+        return dirty
+
     # Verifica se a simulação terminou
     def is_finished(self):
         is_all_issued = (self.program_counter >= self.program_length)
@@ -675,17 +1023,19 @@ class TomasuloSimulator:
             "IPC": ipc,
             "Bubble Cycles": self.bubble_cycles,
             "Program Counter (PC)": self.program_counter,
+            "Bypassed Operands": self.bypassed_operands,
         }
 
     # Reseta o simulador para o estado inicial
     def reset_simulator(self):
         self.register_file = {}
-        self.memory = collections.defaultdict(int)
+        self.memory = SimulatorMemory()
         self.program_counter = 0
         self.program_length = 0
 
         for rs in self.reservation_stations: rs.clear()
         for rob_pos in self.reorder_buffer: rob_pos.clear()
+        self.instruction_pool.reset()
         
         self.rob_head = 0
         self.rob_tail = 0
@@ -694,23 +1044,151 @@ class TomasuloSimulator:
         self.current_cycle = 0
         self.committed_instructions_count = 0
         self.bubble_cycles = 0
+        self.mispredictions = 0
+        self.bypassed_operands = 0
         self.is_running = False
+        self.dirty_all = True
+        self.recent_memory_writes.clear()
+        if self.retire_log is not None:
+            self.retire_log.clear()
+
+# --- Classe VirtualListView ---
+# Lista virtualizada sobre uma Treeview: so existem itens para as linhas visiveis,
+# e o conteudo de cada linha vem de row_provider(indice) no momento do desenho.
+# Assim o custo de abrir e redesenhar nao depende do numero total de linhas.
+class VirtualListView(ttk.Frame):
+    def __init__(self, parent, columns, widths, row_provider, row_tags=None, height=15):
+        super().__init__(parent)
+        self.row_provider = row_provider
+        self.row_tags = row_tags
+        self.row_count = 0
+        self.first = 0
+        self.visible_rows = 0
+        self._rendered = {}
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="none", height=height)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=widths.get(col, 100), anchor="center")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_by(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_by(3))
+        self._set_visible_rows(height)
+
+    def _row_height(self):
+        try:
+            return int(ttk.Style(self).lookup("Treeview", "rowheight")) or 20
+        except (TypeError, ValueError, tk.TclError):
+            return 20
+
+    def _on_configure(self, event):
+        # Uma linha a menos para o cabecalho
+        rows = max(1, event.height // self._row_height() - 1)
+        if rows != self.visible_rows:
+            self._set_visible_rows(rows)
+
+    def _set_visible_rows(self, rows):
+        for slot in range(self.visible_rows, rows):
+            self.tree.insert("", "end", iid=f"slot{slot}")
+        for slot in range(rows, self.visible_rows):
+            self.tree.delete(f"slot{slot}")
+            self._rendered.pop(slot, None)
+        self.visible_rows = rows
+        self.refresh()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.first = int(float(amount) * self.row_count)
+            self.refresh()
+        elif action == "scroll":
+            step = int(amount)
+            self.scroll_by(step * self.visible_rows if unit == "pages" else step)
+
+    def scroll_by(self, rows):
+        self.first += rows
+        self.refresh()
+
+    # Garante que a linha index esteja visivel (centralizando-a se necessario)
+    def scroll_to(self, index):
+        if not self.first <= index < self.first + self.visible_rows:
+            self.first = index - self.visible_rows // 2
+        self.refresh()
+
+    # Indice da linha sob a coordenada y (ou None)
+    def index_at(self, y):
+        iid = self.tree.identify_row(y)
+        if not iid:
+            return None
+        index = self.first + int(iid[len("slot"):])
+        return index if index < self.row_count else None
+
+    def set_row_count(self, row_count):
+        self.row_count = row_count
+        self.refresh()
+
+    # Redesenha apenas as linhas visiveis cujo conteudo mudou
+    def refresh(self):
+        self.first = max(0, min(self.first, self.row_count - self.visible_rows))
+        for slot in range(self.visible_rows):
+            index = self.first + slot
+            if index < self.row_count:
+                row = (self.row_provider(index), self.row_tags(index) if self.row_tags else ())
+            else:
+                row = ((), ())
+            if self._rendered.get(slot) != row:
+                self.tree.item(f"slot{slot}", values=row[0], tags=row[1])
+                self._rendered[slot] = row
+
+        if self.row_count > self.visible_rows:
+            self.scrollbar.set(self.first / self.row_count, (self.first + self.visible_rows) / self.row_count)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+
+# Limite de quadros por segundo ao executar automaticamente
+GUI_MAX_FPS = 30
+# Velocidade do "Executar Tudo" em log10(ciclos/s); o maximo da escala significa sem limite
+SPEED_SCALE_MAX = 6
 
 # --- Classe TomasuloGUI ---
 class TomasuloGUI:
-    def __init__(self, master, simulator):
+    def __init__(self, master, simulator, program_file=DEFAULT_PROGRAM_FILE):
         self.master = master
+        self.program_file = program_file
         self.master.title("Simulador Tomasulo")
         self.simulator = simulator
         self.running_auto = False
-
-        self._create_dummy_instructions_file()
+        self._run_job = None
+        self._run_stop_condition = None
+        self._run_credit = 0.0
+        self._run_last_frame = 0.0
+        self.breakpoints = set()
+
+        # Estado do redesenho incremental
+        self._row_cache = {}
+        self._register_names = None
+        self._memory_addresses = None
+        self._memory_address_set = set()
+        self._recent_addresses = []
+        self._rs_by_name = {rs.name: rs for rs in simulator.reservation_stations}
+
+        if program_file == DEFAULT_PROGRAM_FILE:
+            self._create_dummy_instructions_file()
+        if simulator.initial_state is None:
+            simulator.set_initial_state(create_default_state_file())
 
         self.setup_ui()
         self.load_initial_program()
 
     def _create_dummy_instructions_file(self):
-        filename = "instructions.txt"
+        filename = DEFAULT_PROGRAM_FILE
         if os.path.exists(filename) and os.path.getsize(filename) > 0:
             print(f"Arquivo '{filename}' ja existe e nao esta vazio. Usando conteudo existente.")
             return
@@ -751,9 +1229,19 @@ DIV R6, R1, R2          # Continua - indice 8
         for i in range(4):
             right_frame.grid_columnconfigure(i, weight=1)
 
-        ttk.Label(left_frame, text="Programa de Instrucoes:").grid(row=0, column=0, sticky="nw", pady=(0, 5))
-        self.program_text = scrolledtext.ScrolledText(left_frame, wrap=tk.WORD, height=15, width=40, state='disabled')
-        self.program_text.grid(row=0, column=0, sticky="nsew", padx=(0, 10), pady=(0, 10))
+        program_frame = ttk.Frame(left_frame)
+        program_frame.grid(row=0, column=0, sticky="nsew", padx=(0, 10), pady=(0, 10))
+        program_frame.grid_rowconfigure(1, weight=1)
+        program_frame.grid_columnconfigure(0, weight=1)
+
+        ttk.Label(program_frame, text="Programa de Instrucoes:").grid(row=0, column=0, sticky="w", pady=(0, 5))
+        self.follow_pc_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(program_frame, text="Seguir PC", variable=self.follow_pc_var).grid(row=0, column=1, padx=5, pady=(0, 5))
+        ttk.Button(program_frame, text="Ir para PC", command=self.jump_to_pc).grid(row=0, column=2, pady=(0, 5))
+
+        self.program_view = VirtualListView(program_frame, ["#", "Instrucao"], {"#": 50, "Instrucao": 250},
+                                            self._program_row, self._program_row_tags)
+        self.program_view.grid(row=1, column=0, columnspan=3, sticky="nsew")
 
         control_frame = ttk.Frame(left_frame)
         control_frame.grid(row=1, column=0, sticky="ew", pady=(10, 5))
@@ -774,11 +1262,36 @@ DIV R6, R1, R2          # Continua - indice 8
         self.load_program_button = ttk.Button(control_frame, text="Carregar Programa", command=self.load_initial_program)
         self.load_program_button.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
 
+        self.pause_button = ttk.Button(control_frame, text="Pausar", command=self.pause)
+        self.pause_button.grid(row=1, column=0, padx=5, pady=5, sticky="ew")
+
+        self.run_to_mispredict_button = ttk.Button(control_frame, text="Ate Mispredict", command=self.run_to_next_mispredict)
+        self.run_to_mispredict_button.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+        self.target_cycle_entry = ttk.Entry(control_frame, width=8)
+        self.target_cycle_entry.grid(row=1, column=2, padx=5, pady=5, sticky="ew")
+
+        self.run_to_cycle_button = ttk.Button(control_frame, text="Ate Ciclo", command=self.run_to_cycle)
+        self.run_to_cycle_button.grid(row=1, column=3, padx=5, pady=5, sticky="ew")
+
+        ttk.Label(control_frame, text="Velocidade:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        # Padrao sem limite (redesenho limitado a GUI_MAX_FPS); a escala permite desacelerar
+        self.speed_var = tk.DoubleVar(value=SPEED_SCALE_MAX)
+        self.speed_scale = ttk.Scale(control_frame, from_=0, to=SPEED_SCALE_MAX, variable=self.speed_var,
+                                     command=lambda _: self._update_speed_label())
+        self.speed_scale.grid(row=2, column=1, columnspan=2, padx=5, pady=5, sticky="ew")
+        self.speed_label = ttk.Label(control_frame, text="")
+        self.speed_label.grid(row=2, column=3, padx=5, pady=5, sticky="w")
+        self._update_speed_label()
+
+        self.status_label = ttk.Label(control_frame, text="Duplo clique em uma instrucao marca/desmarca breakpoint.")
+        self.status_label.grid(row=3, column=0, columnspan=4, padx=5, pady=(0, 5), sticky="w")
+
         metrics_frame = ttk.LabelFrame(left_frame, text="Metricas de Desempenho", padding="10")
         metrics_frame.grid(row=2, column=0, sticky="ew", pady=(10, 0))
 
         self.metrics_labels = {}
-        metrics_order = ["Total Cycles", "Committed Instructions", "IPC", "Bubble Cycles", "Program Counter (PC)"]
+        metrics_order = ["Total Cycles", "Committed Instructions", "IPC", "Bubble Cycles", "Program Counter (PC)", "Bypassed Operands"]
         for i, metric in enumerate(metrics_order):
             ttk.Label(metrics_frame, text=f"{metric}:").grid(row=i, column=0, sticky="w", padx=5, pady=2)
             value_label = ttk.Label(metrics_frame, text="0")
@@ -806,13 +1319,27 @@ DIV R6, R1, R2          # Continua - indice 8
         )
         self.reg_tree.grid(row=2, column=0, columnspan=2, sticky="nsew", pady=(25, 10), padx=(0, 5))
 
-        ttk.Label(right_frame, text="Memoria:").grid(row=2, column=2, sticky="nw", pady=(0, 5), columnspan=2)
-        self.mem_tree = self._create_treeview(right_frame,
-            ["Endereco", "Valor"],
-            {"Endereco": 80, "Valor": 80}
-        )
-        self.mem_tree.grid(row=2, column=2, columnspan=2, sticky="nsew", pady=(25, 10), padx=(5, 0))
-
+        memory_frame = ttk.Frame(right_frame)
+        memory_frame.grid(row=2, column=2, columnspan=2, sticky="nsew", pady=(0, 10), padx=(5, 0))
+        memory_frame.grid_rowconfigure(1, weight=1)
+        memory_frame.grid_columnconfigure(0, weight=1)
+
+        ttk.Label(memory_frame, text="Memoria:").grid(row=0, column=0, sticky="w", pady=(0, 5))
+        self.memory_address_entry = ttk.Entry(memory_frame, width=8)
+        self.memory_address_entry.grid(row=0, column=1, padx=2, pady=(0, 5))
+        self.memory_address_entry.bind("<Return>", lambda e: self.jump_to_address())
+        ttk.Button(memory_frame, text="Ir", width=3, command=self.jump_to_address).grid(row=0, column=2, padx=2, pady=(0, 5))
+        self.recent_writes_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(memory_frame, text="Escritas recentes", variable=self.recent_writes_var,
+                        command=self._refresh_memory_view).grid(row=0, column=3, padx=2, pady=(0, 5))
+
+        self.memory_view = VirtualListView(memory_frame, ["Endereco", "Valor"], {"Endereco": 80, "Valor": 80},
+                                           self._memory_row, height=10)
+        self.memory_view.grid(row=1, column=0, columnspan=4, sticky="nsew")
+
+        self.program_view.tree.tag_configure("breakpoint", background="#f4a6a6")
+        self.program_view.tree.tag_configure("highlight", background="yellow")
+        self.program_view.tree.bind("<Double-Button-1>", self._toggle_breakpoint)
         self.update_gui()
 
     def _create_treeview(self, parent_frame, columns, widths):
@@ -828,31 +1355,24 @@ DIV R6, R1, R2          # Continua - indice 8
         return tree
 
     def load_initial_program(self):
+        if self.running_auto:
+            self._stop_run("")
         self.simulator.reset_simulator()
-        if self.simulator.load_instructions():
-            self.program_text.config(state='normal')
-            self.program_text.delete(1.0, tk.END)
-            for idx, inst in enumerate(self.simulator.program_instructions):
-                self.program_text.insert(tk.END, f"[{idx}]: {inst}\n")
-            self.program_text.config(state='disabled')
+        # O arquivo de estado e relido a cada carga, como o de instrucoes
+        try:
+            self.simulator.reload_initial_state()
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Erro de Carregamento", f"Estado inicial mantido: {e}")
+        if self.simulator.load_instructions(self.program_file):
+            self.breakpoints.clear()
+            self.program_view.first = 0
+            self.program_view.set_row_count(len(self.simulator.program_instructions))
             self.initial_program_loaded = True
             messagebox.showinfo("Sucesso", "Programa de instruções carregado com sucesso!")
         else:
             self.initial_program_loaded = False
-        
-        if 'R0' not in self.simulator.register_file: self.simulator.register_file['R0'] = Register('R0')
-        self.simulator.register_file['R0'].value = 0 
-        self.simulator.register_file['R0'].clear() 
-
-        if 'R1' not in self.simulator.register_file: self.simulator.register_file['R1'] = Register('R1')
-        self.simulator.register_file['R1'].value = 5
-        if 'R2' not in self.simulator.register_file: self.simulator.register_file['R2'] = Register('R2')
-        self.simulator.register_file['R2'].value = 5
-
-        self.simulator.memory[108] = 5
-        self.simulator.memory[16] = 0
-        self.simulator.memory[12] = 7
-        
+
+        self._memory_addresses = None
         self.update_gui()
 
     def next_cycle(self):
@@ -870,103 +1390,365 @@ DIV R6, R1, R2          # Continua - indice 8
             messagebox.showinfo("Simulação Concluída", "Todas as instruções já foram processadas!")
             self.running_auto = False
 
+    # Velocidade escolhida em ciclos/s (None = sem limite)
+    def _cycles_per_second(self):
+        speed = self.speed_var.get()
+        if speed >= SPEED_SCALE_MAX:
+            return None
+        return 10 ** speed
+
+    def _update_speed_label(self):
+        cycles_per_second = self._cycles_per_second()
+        self.speed_label.config(text="maxima" if cycles_per_second is None else f"{cycles_per_second:.0f} ciclos/s")
+
+    def _toggle_breakpoint(self, event):
+        pc = self.program_view.index_at(event.y)
+        if pc is None:
+            return "break"
+        if pc in self.breakpoints:
+            self.breakpoints.discard(pc)
+        else:
+            self.breakpoints.add(pc)
+        self.program_view.refresh()
+        return "break"
+
+    def _program_row(self, index):
+        return (index, str(self.simulator.program_instructions[index]))
+
+    def _program_row_tags(self, index):
+        if index == self.simulator.program_counter:
+            return ("highlight",)
+        if index in self.breakpoints:
+            return ("breakpoint",)
+        return ()
+
+    def jump_to_pc(self):
+        self.program_view.scroll_to(self.simulator.program_counter)
+
+    # Enderecos exibidos no painel de memoria (todos os tocados ou so as escritas recentes)
+    def _visible_memory_addresses(self):
+        if self.recent_writes_var.get():
+            return self._recent_addresses
+        return self._memory_addresses
+
+    def _memory_row(self, index):
+        addr = self._visible_memory_addresses()[index]
+        return (f"End. {addr}", self.simulator.memory.get(addr, 0))
+
+    def _refresh_memory_view(self):
+        if self.recent_writes_var.get():
+            self._recent_addresses = list(reversed(self.simulator.recent_memory_writes))
+        self.memory_view.set_row_count(len(self._visible_memory_addresses()))
+
+    def jump_to_address(self):
+        try:
+            addr = int(self.memory_address_entry.get())
+        except ValueError:
+            messagebox.showwarning("Aviso", "Informe um endereco de memoria valido.")
+            return
+        if self.recent_writes_var.get():
+            if addr in self._recent_addresses:
+                self.memory_view.scroll_to(self._recent_addresses.index(addr))
+                return
+            # Fora das escritas recentes: volta para a lista completa
+            self.recent_writes_var.set(False)
+        # Um endereco ainda nao listado (ex.: de uma REGION) entra na lista; o valor
+        # vem de memory.get, que le a regiao sob demanda
+        if addr not in self._memory_address_set:
+            self._memory_address_set.add(addr)
+            bisect.insort(self._memory_addresses, addr)
+        self._refresh_memory_view()
+        self.memory_view.scroll_to(bisect.bisect_left(self._memory_addresses, addr))
+
     def run_all(self):
+        self._start_run(None)
+
+    def run_to_cycle(self):
+        try:
+            target = int(self.target_cycle_entry.get())
+        except ValueError:
+            messagebox.showwarning("Aviso", "Informe o numero do ciclo de destino.")
+            return
+        self._start_run(lambda sim: sim.current_cycle >= target)
+
+    def run_to_next_mispredict(self):
+        count = self.simulator.mispredictions
+        self._start_run(lambda sim: sim.mispredictions > count)
+
+    def pause(self):
+        if self.running_auto:
+            self._stop_run(f"Pausado no ciclo {self.simulator.current_cycle}.")
+
+    # Inicia a execucao automatica ate o fim, ate um breakpoint ou ate stop_condition(simulador)
+    def _start_run(self, stop_condition):
         if not self.initial_program_loaded:
             messagebox.showwarning("Aviso", "Por favor, carregue um programa primeiro.")
             return
-        
+        if self.simulator.is_finished():
+            messagebox.showinfo("Simulação Concluída", "Todas as instruções já foram processadas!")
+            return
+
+        if self._run_job is not None:
+            self.master.after_cancel(self._run_job)
         self.running_auto = True
+        self._run_stop_condition = stop_condition
+        self._run_credit = 0.0
+        self._run_last_frame = time.perf_counter()
+        self.status_label.config(text="Executando...")
         self._run_all_cycles()
 
+    def _stop_run(self, status):
+        self.running_auto = False
+        if self._run_job is not None:
+            self.master.after_cancel(self._run_job)
+            self._run_job = None
+        self.update_gui()
+        self.status_label.config(text=status)
+
+    # Executa um lote de ciclos e redesenha uma vez por quadro (no maximo GUI_MAX_FPS quadros/s)
     def _run_all_cycles(self):
-        if self.running_auto and not self.simulator.is_finished():
-            self.simulator.clock_tick()
-            self.update_gui()
-            self.master.after(100, self._run_all_cycles)
-        elif self.simulator.is_finished():
+        self._run_job = None
+        if not self.running_auto:
+            return
+
+        frame_start = time.perf_counter()
+        frame_budget = 1.0 / GUI_MAX_FPS
+        cycles_per_second = self._cycles_per_second()
+        if cycles_per_second is None:
+            cycles_allowed = None
+        else:
+            self._run_credit = min(self._run_credit + (frame_start - self._run_last_frame) * cycles_per_second,
+                                   cycles_per_second * frame_budget * 2 + 1)
+            cycles_allowed = int(self._run_credit)
+        self._run_last_frame = frame_start
+
+        sim = self.simulator
+        stop_condition = self._run_stop_condition
+        breakpoints = self.breakpoints
+        executed = 0
+        while not sim.is_finished():
+            if cycles_allowed is not None and executed >= cycles_allowed:
+                break
+            # Verifica o tempo a cada 64 ciclos para manter a interface responsiva
+            if (executed & 63) == 63 and time.perf_counter() - frame_start >= frame_budget:
+                break
+            pc_before = sim.program_counter
+            sim.clock_tick()
+            executed += 1
+            if stop_condition is not None and stop_condition(sim):
+                self._stop_run(f"Parado no ciclo {sim.current_cycle}.")
+                return
+            if sim.program_counter != pc_before and sim.program_counter in breakpoints:
+                self._stop_run(f"Breakpoint em [{sim.program_counter}] no ciclo {sim.current_cycle}.")
+                return
+        if cycles_allowed is not None:
+            self._run_credit -= executed
+
+        if sim.is_finished():
+            self._stop_run(f"Concluido em {sim.current_cycle} ciclos.")
             messagebox.showinfo("Simulação Concluída", "Todas as instruções foram processadas!")
-            self.running_auto = False
+            return
+
+        self.update_gui()
+        elapsed_ms = int((time.perf_counter() - frame_start) * 1000)
+        self._run_job = self.master.after(max(1, int(frame_budget * 1000) - elapsed_ms), self._run_all_cycles)
 
     def reset_simulation(self):
-        self.running_auto = False
+        if self.running_auto:
+            self._stop_run("")
         self.simulator.reset_simulator()
         self.load_initial_program()
         messagebox.showinfo("Reiniciar", "Simulação reiniciada.")
 
-    def update_gui(self):
-        for i in self.rob_tree.get_children():
-            self.rob_tree.delete(i)
+    # Atualiza uma linha da Treeview somente se os valores mudaram
+    def _set_row(self, tree, iid, values):
+        if self._row_cache.get(iid) != values:
+            tree.item(iid, values=values)
+            self._row_cache[iid] = values
+
+    def _rob_row(self, entry):
+        return (
+            entry.id,
+            "Sim" if entry.busy else "Não",
+            str(entry.instruction) if entry.instruction else "",
+            entry.state,
+            str(entry.destination_reg) if entry.destination_reg else "",
+            str(entry.value) if entry.value is not None else "",
+            entry.inst_type,
+            "T" if entry.predicted_taken == PREDICT_TAKEN else ("NT" if entry.predicted_taken == PREDICT_NOT_TAKEN else ""),
+            "T" if entry.actual_taken == PREDICT_TAKEN else ("NT" if entry.actual_taken == PREDICT_NOT_TAKEN else "")
+        )
+
+    def _rs_row(self, rs):
+        return (
+            rs.name,
+            "Sim" if rs.busy else "Não",
+            str(rs.op) if rs.op else "",
+            str(rs.Vj) if rs.Vj is not None else "",
+            str(rs.Vk) if rs.Vk is not None else "",
+            str(rs.Qj) if rs.Qj is not None else "",
+            str(rs.Qk) if rs.Qk is not None else "",
+            str(rs.destination_rob_id) if rs.destination_rob_id is not None else ""
+        )
+
+    def _reg_row(self, reg):
+        return (
+            reg.name,
+            str(reg.value),
+            str(reg.reorder_tag) if reg.reorder_tag is not None else "",
+            "Sim" if reg.busy else "Não"
+        )
+
+    # Recria todas as linhas das tabelas com ids estaveis (usado na carga/reinicio do programa)
+    def _rebuild_tables(self):
+        self._row_cache = {}
+        for tree in (self.rob_tree, self.rs_tree, self.reg_tree):
+            tree.delete(*tree.get_children())
+
         for entry in self.simulator.reorder_buffer:
-            self.rob_tree.insert("", "end", values=(
-                entry.id,
-                "Sim" if entry.busy else "Não",
-                str(entry.instruction) if entry.instruction else "",
-                entry.state,
-                str(entry.destination_reg) if entry.destination_reg else "",
-                str(entry.value) if entry.value is not None else "",
-                entry.inst_type,
-                "T" if entry.predicted_taken == PREDICT_TAKEN else ("NT" if entry.predicted_taken == PREDICT_NOT_TAKEN else ""),
-                "T" if entry.actual_taken == PREDICT_TAKEN else ("NT" if entry.actual_taken == PREDICT_NOT_TAKEN else "")
-            ))
-        
-        for i in self.rs_tree.get_children():
-            self.rs_tree.delete(i)
+            self.rob_tree.insert("", "end", iid=f"rob{entry.id}")
         for rs in self.simulator.reservation_stations:
-            self.rs_tree.insert("", "end", values=(
-                rs.name,
-                "Sim" if rs.busy else "Não",
-                str(rs.op) if rs.op else "",
-                str(rs.Vj) if rs.Vj is not None else "",
-                str(rs.Vk) if rs.Vk is not None else "",
-                str(rs.Qj) if rs.Qj is not None else "",
-                str(rs.Qk) if rs.Qk is not None else "",
-                str(rs.destination_rob_id) if rs.destination_rob_id is not None else ""
-            ))
-
-        for i in self.reg_tree.get_children():
-            self.reg_tree.delete(i)
-        sorted_regs = sorted(self.simulator.register_file.values(), key=lambda r: r.name)
-        for reg in sorted_regs:
-            self.reg_tree.insert("", "end", values=(
-                reg.name,
-                str(reg.value),
-                str(reg.reorder_tag) if reg.reorder_tag is not None else "",
-                "Sim" if reg.busy else "Não"
-            ))
-
-        for i in self.mem_tree.get_children():
-            self.mem_tree.delete(i)
-        accessed_memory = sorted([addr for addr, val in self.simulator.memory.items() if val != 0 or addr in [108, 211, 16, 12]])
-        for addr in accessed_memory: 
-            self.mem_tree.insert("", "end", values=(f"End. {addr}", self.simulator.memory[addr]))
-        for i in range(5):
-             if i not in accessed_memory:
-                 self.mem_tree.insert("", "end", values=(f"End. {i}", self.simulator.memory[i]))
-
-
-        metrics = self.simulator.get_metrics()
+            self.rs_tree.insert("", "end", iid=f"rs{rs.name}")
+        self._register_names = sorted(self.simulator.register_file)
+        for name in self._register_names:
+            self.reg_tree.insert("", "end", iid=f"reg{name}")
+
+    def update_gui(self):
+        profiler = self.simulator.profiler
+        if profiler is None:
+            self._update_gui()
+            return
+        start = time.perf_counter()
+        self._update_gui()
+        profiler.add("update_gui", time.perf_counter() - start)
+
+    def _update_gui(self):
+        sim = self.simulator
+        dirty_all, dirty_rob, dirty_rs, dirty_registers, dirty_memory = sim.consume_dirty()
+
+        if dirty_all:
+            if self._register_names != sorted(sim.register_file):
+                self._rebuild_tables()
+            dirty_rob = range(len(sim.reorder_buffer))
+            dirty_rs = [rs.name for rs in sim.reservation_stations]
+            dirty_registers = sim.register_file.keys()
+
+        for rob_id in dirty_rob:
+            self._set_row(self.rob_tree, f"rob{rob_id}", self._rob_row(sim.reorder_buffer[rob_id]))
+        for rs_name in dirty_rs:
+            self._set_row(self.rs_tree, f"rs{rs_name}", self._rs_row(self._rs_by_name[rs_name]))
+        for reg_name in dirty_registers:
+            self._set_row(self.reg_tree, f"reg{reg_name}", self._reg_row(sim.register_file[reg_name]))
+
+        # Enderecos tocados: lista ordenada completa so na carga, depois apenas os novos enderecos escritos
+        if self._memory_addresses is None:
+            self._memory_addresses = sorted(sim.memory)
+            self._memory_address_set = set(self._memory_addresses)
+        for addr in dirty_memory:
+            if addr not in self._memory_address_set:
+                self._memory_address_set.add(addr)
+                bisect.insort(self._memory_addresses, addr)
+        self._refresh_memory_view()
+
+        metrics = sim.get_metrics()
         self.metrics_labels["Total Cycles"].config(text=str(metrics["Total Cycles"]))
         self.metrics_labels["Committed Instructions"].config(text=str(metrics["Committed Instructions"]))
         self.metrics_labels["IPC"].config(text=f"{metrics['IPC']:.2f}")
         self.metrics_labels["Bubble Cycles"].config(text=str(metrics["Bubble Cycles"]))
-        self.metrics_labels["Program Counter (PC)"].config(text=str(self.simulator.program_counter))
-
+        self.metrics_labels["Program Counter (PC)"].config(text=str(sim.program_counter))
+        self.metrics_labels["Bypassed Operands"].config(text=str(metrics["Bypassed Operands"]))
 
-        self.program_text.config(state='normal')
-        for tag in self.program_text.tag_names():
-            if tag.startswith("state_") or tag == "highlight":
-                self.program_text.tag_remove(tag, "1.0", tk.END)
+        # Programa: so as linhas visiveis sao redesenhadas (inclui o destaque do PC)
+        if self.follow_pc_var.get() and sim.program_counter < self.program_view.row_count:
+            self.program_view.scroll_to(sim.program_counter)
+        else:
+            self.program_view.refresh()
+
+
+# Execucao sem interface grafica: simula o programa e imprime as metricas
+def run_headless(simulator, args):
+    with open(args.program, 'r') as f:
+        simulator.load_program(f.readlines())
+    if args.timing or args.export:
+        simulator.enable_retire_log(max(simulator.program_length, 1))
+
+    metrics = simulator.run(args.max_cycles)
+    for name, value in metrics.items():
+        print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
+    if not simulator.is_finished():
+        print(f"Simulacao interrompida apos {simulator.current_cycle} ciclos (--max-cycles).")
+
+    if args.timing or args.export:
+        from tomasulo_stats import timing_report, format_report, export_report
+        report = timing_report(simulator)
+        if args.timing:
+            print()
+            print(format_report(report))
+        if args.export:
+            export_report(report, args.export)
+            print(f"Relatorio de latencias salvo em '{args.export}'.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador do algoritmo de Tomasulo")
+    parser.add_argument("program", nargs="?", default=DEFAULT_PROGRAM_FILE,
+                        help=f"arquivo de instrucoes (padrao {DEFAULT_PROGRAM_FILE})")
+    parser.add_argument("--headless", action="store_true", help="executa sem interface grafica e imprime as metricas")
+    parser.add_argument("--state", help=f"arquivo de estado inicial (registradores e memoria, padrao {DEFAULT_STATE_FILE})")
+    parser.add_argument("--max-cycles", type=int, help="limite de ciclos (modo --headless)")
+    parser.add_argument("--rob-size", type=int, default=8)
+    parser.add_argument("--mem-rs", type=int, default=2)
+    parser.add_argument("--add-rs", type=int, default=3)
+    parser.add_argument("--logic-rs", type=int, default=2)
+    parser.add_argument("--mult-rs", type=int, default=1)
+    parser.add_argument("--bypass-issue", action="store_true", help="emissao le resultados ja calculados no ROB")
+    parser.add_argument("--bypass-wakeup", action="store_true", help="resultados acordam dependentes antes do CDB")
+    parser.add_argument("--timing", action="store_true",
+                        help="imprime histogramas/percentis de latencia por instrucao (modo --headless, requer numpy)")
+    parser.add_argument("--export", help="salva o relatorio de latencias em .json ou .csv (modo --headless)")
+    parser.add_argument("--profile", action="store_true",
+                        help="mede o tempo de host por estagio (e por atualizacao da GUI) e imprime ao final")
+    args = parser.parse_args()
+    # As opcoes de relatorio so valem com --headless; na interface grafica seriam ignoradas
+    if not args.headless:
+        headless_only = [flag for flag, value in (("--max-cycles", args.max_cycles is not None),
+                                                  ("--timing", args.timing), ("--export", args.export))
+                         if value]
+        if headless_only:
+            parser.error(f"{', '.join(headless_only)} {'requerem' if len(headless_only) > 1 else 'requer'} --headless")
+
+    simulator_instance = TomasuloSimulator(
+        num_mem_rs=args.mem_rs, num_add_rs=args.add_rs, num_logic_rs=args.logic_rs,
+        num_mult_rs=args.mult_rs, rob_size=args.rob_size,
+        bypass_issue=args.bypass_issue, bypass_wakeup=args.bypass_wakeup,
+    )
+    # Todas as interfaces partem do mesmo arquivo de estado inicial
+    try:
+        simulator_instance.set_initial_state(args.state or create_default_state_file())
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.timing or args.export:
+        # Os relatorios usam NumPy: falha antes de simular se ele nao estiver instalado
+        try:
+            import tomasulo_stats  # noqa: F401
+        except ImportError as e:
+            parser.error(f"--timing/--export requerem numpy ({e})")
+    if args.profile:
+        simulator_instance.enable_profiling()
+    try:
+        if args.headless:
+            run_headless(simulator_instance, args)
+        else:
+            root = tk.Tk()
+            gui = TomasuloGUI(root, simulator_instance, program_file=args.program)
+            root.mainloop()
+    finally:
+        simulator_instance.close()
 
-        if self.simulator.program_counter < len(self.simulator.program_instructions):
-            line_number = self.simulator.program_counter + 1
-            self.program_text.tag_add("highlight", f"{line_number}.0", f"{line_number}.end")
-            self.program_text.tag_config("highlight", background="yellow")
-        
-        self.program_text.config(state='disabled')
+    if args.profile:
+        print()
+        print(simulator_instance.profiler.report())
 
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    simulator_instance = TomasuloSimulator()
-    gui = TomasuloGUI(root, simulator_instance)
-    root.mainloop()
\ No newline at end of file
+    main()
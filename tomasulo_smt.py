@@ -0,0 +1,315 @@
+import argparse
+import collections
+
+from tomasulo_sim import TomasuloSimulator, Register, PREDICT_TAKEN, parse_program
+from tomasulo_state import DEFAULT_STATE_FILE, create_default_state_file
+
+# Multithreading simultaneo (SMT) sobre um unico nucleo Tomasulo. Cada thread
+# de hardware tem seu programa, PC e arquivo de registradores (tabela de
+# renomeacao); estacoes de reserva, unidades funcionais, CDB e memoria sao
+# compartilhados. As entradas do ROB vem de uma lista livre comum e cada
+# thread guarda as suas em ordem de programa, entao a confirmacao e em ordem
+# por thread. O ROB pode ser compartilhado (qualquer thread usa qualquer
+# entrada livre) ou particionado (rob_size // num_threads entradas por thread).
+#
+# A cada ciclo uma instrucao e emitida, da primeira thread que conseguir na
+# ordem dada pela politica de busca:
+#   round_robin: a prioridade gira entre as threads a cada ciclo;
+#   icount: primeiro a thread com menos instrucoes aguardando execucao.
+# Cada thread confirma no maximo uma instrucao por ciclo.
+# Os registradores em dirty_registers (consume_dirty) sao pares (thread, nome),
+# ja que cada thread tem o seu R1, R2, ...
+
+FETCH_ROUND_ROBIN = "round_robin"
+FETCH_ICOUNT = "icount"
+FETCH_POLICIES = [FETCH_ROUND_ROBIN, FETCH_ICOUNT]
+
+ROB_SHARED = "shared"
+ROB_PARTITIONED = "partitioned"
+ROB_POLICIES = [ROB_SHARED, ROB_PARTITIONED]
+
+# Estados do ROB contados pelo ICOUNT (instrucoes ainda nao executadas)
+ICOUNT_STATES = ("Issued", "Executing")
+
+
+# --- Classe HardwareThread ---
+class HardwareThread:
+    def __init__(self, thread_id):
+        self.id = thread_id
+        self.program_instructions = []
+        self.program_length = 0
+        self.program_counter = 0
+        self.register_file = {}
+        self.rob_ids = collections.deque()  # entradas do ROB da thread, da mais antiga para a mais nova
+        self.committed_instructions_count = 0
+        self.mispredictions = 0
+
+    def reset(self):
+        self.program_counter = 0
+        self.rob_ids.clear()
+        self.committed_instructions_count = 0
+        self.mispredictions = 0
+
+
+# --- Classe SMTTomasuloSimulator ---
+# Reaproveita os estagios de execucao e escrita do TomasuloSimulator; a emissao
+# vincula a thread escolhida (programa, PC e registradores) ao simulador antes
+# de delegar ao issue_stage original, e a confirmacao e feita por thread.
+class SMTTomasuloSimulator(TomasuloSimulator):
+    def __init__(self, num_threads=2, fetch_policy=FETCH_ROUND_ROBIN, rob_policy=ROB_SHARED, **kwargs):
+        if fetch_policy not in FETCH_POLICIES:
+            raise ValueError(f"Politica de busca desconhecida: {fetch_policy}")
+        if rob_policy not in ROB_POLICIES:
+            raise ValueError(f"Politica de ROB desconhecida: {rob_policy}")
+        super().__init__(**kwargs)
+        self.config.update({"num_threads": num_threads, "fetch_policy": fetch_policy, "rob_policy": rob_policy})
+        self.fetch_policy = fetch_policy
+        self.rob_policy = rob_policy
+        self.threads = [HardwareThread(i) for i in range(num_threads)]
+        self.rob_partition_size = max(len(self.reorder_buffer) // num_threads, 1)
+        self.free_rob_ids = collections.deque(range(len(self.reorder_buffer)))
+        self.rob_thread = [None] * len(self.reorder_buffer)
+        self.bound_thread = self.threads[0]
+
+    # --- Carga ---
+    # programs: uma lista de linhas por thread
+    def load_programs(self, programs):
+        if len(programs) != len(self.threads):
+            raise ValueError(f"Esperados {len(self.threads)} programas, recebidos {len(programs)}.")
+        self.reset_simulator()
+        for thread, lines in zip(self.threads, programs):
+            thread.program_instructions = []
+            thread.register_file = {}
+            for instruction in parse_program(lines):
+                instruction.latency = self.latencies.get(instruction.opname, instruction.latency)
+                thread.program_instructions.append(instruction)
+                for reg_name in (instruction.destination, instruction.source1, instruction.source2):
+                    if reg_name and reg_name not in thread.register_file:
+                        thread.register_file[reg_name] = Register(reg_name)
+            thread.program_length = len(thread.program_instructions)
+        # Mesma imagem inicial para todas as threads (registradores privados, memoria compartilhada)
+        if self.initial_state is not None:
+            for thread in self.threads:
+                for name, value in self.initial_state.registers.items():
+                    self.set_register(thread.id, name, value)
+            self.memory = self.initial_state.build_memory()
+        self._bind_thread(self.threads[0])
+        self.dirty_all = True
+
+    # Mesmo programa em todas as threads
+    def load_program(self, lines):
+        self.load_programs([lines] * len(self.threads))
+
+    def load_program_files(self, filenames):
+        programs = []
+        for filename in filenames:
+            with open(filename, 'r') as f:
+                programs.append(f.readlines())
+        self.load_programs(programs)
+
+    def set_register(self, thread_id, name, value):
+        register_file = self.threads[thread_id].register_file
+        if name not in register_file:
+            register_file[name] = Register(name)
+        register_file[name].value = value
+
+    def reset_simulator(self):
+        super().reset_simulator()
+        for thread in self.threads:
+            thread.reset()
+        self.free_rob_ids = collections.deque(range(len(self.reorder_buffer)))
+        self.rob_thread = [None] * len(self.reorder_buffer)
+
+    # Faz o simulador base enxergar o programa, o PC e os registradores da thread
+    def _bind_thread(self, thread):
+        self.bound_thread = thread
+        self.program_instructions = thread.program_instructions
+        self.program_length = thread.program_length
+        self.program_counter = thread.program_counter
+        self.register_file = thread.register_file
+
+    # Registradores alterados pelos estagios herdados pertencem a thread vinculada
+    def _mark_register_dirty(self, name):
+        self.dirty_registers.add((self.bound_thread.id, name))
+
+    # --- Emissao ---
+    def _get_free_rob_entry(self):
+        return self.free_rob_ids[0] if self.free_rob_ids else -1
+
+    def _icount(self, thread):
+        return sum(1 for rob_id in thread.rob_ids if self.reorder_buffer[rob_id].state in ICOUNT_STATES)
+
+    def _fetch_order(self):
+        n = len(self.threads)
+        start = self.current_cycle % n
+        order = [self.threads[(start + i) % n] for i in range(n)]
+        if self.fetch_policy == FETCH_ICOUNT:
+            order.sort(key=self._icount)  # estavel: empates seguem o round-robin
+        return order
+
+    def issue_stage(self):
+        for thread in self._fetch_order():
+            if thread.program_counter >= thread.program_length:
+                continue
+            if self.rob_policy == ROB_PARTITIONED and len(thread.rob_ids) >= self.rob_partition_size:
+                continue
+
+            self._bind_thread(thread)
+            issued = super().issue_stage()
+            if issued:
+                rob_id = self.free_rob_ids.popleft()
+                thread.rob_ids.append(rob_id)
+                self.rob_thread[rob_id] = thread.id
+                thread.program_counter = self.program_counter
+                return True
+        return False
+
+    # --- Confirmacao ---
+    def commit_stage(self):
+        committed_this_cycle = False
+        for thread in self.threads:
+            if thread.rob_ids and self._commit_thread(thread):
+                committed_this_cycle = True
+        return committed_this_cycle
+
+    def _commit_thread(self, thread):
+        head_rob_entry = self.reorder_buffer[thread.rob_ids[0]]
+        inst_obj = head_rob_entry.instruction
+        if not (head_rob_entry.busy and inst_obj):
+            return False
+
+        # Entra no estado "Commit" (visivel por um ciclo)
+        if head_rob_entry.state == "Write Result" and inst_obj.commit_cycle == -1:
+            head_rob_entry.state = "Commit"
+            inst_obj.commit_cycle = self.current_cycle
+            self.dirty_rob.add(head_rob_entry.id)
+            return True
+
+        if not (head_rob_entry.state == "Commit" and inst_obj.commit_cycle == self.current_cycle - 1):
+            return False
+
+        self.dirty_rob.add(head_rob_entry.id)
+        if head_rob_entry.inst_type == "BRANCH":
+            if head_rob_entry.predicted_taken != head_rob_entry.actual_taken:
+                self._flush_thread(thread, head_rob_entry)
+        elif head_rob_entry.inst_type != "STORE":
+            dest_reg_name = head_rob_entry.destination_reg
+            if dest_reg_name:
+                reg = thread.register_file[dest_reg_name]
+                if reg.reorder_tag == head_rob_entry.id:
+                    reg.value = head_rob_entry.value
+                    reg.clear()
+                    self.dirty_registers.add((thread.id, dest_reg_name))
+
+        head_rob_entry.clear()
+        self._release_rob_entry(thread.rob_ids.popleft())
+        thread.committed_instructions_count += 1
+        self.committed_instructions_count += 1
+        return True
+
+    def _release_rob_entry(self, rob_id):
+        self.rob_thread[rob_id] = None
+        self.free_rob_ids.append(rob_id)
+        self.current_rob_entries -= 1
+
+    # Misprediction: descarta apenas as instrucoes mais novas da propria thread
+    def _flush_thread(self, thread, head_rob_entry):
+        inst_obj = head_rob_entry.instruction
+        print(f"!!! Misprediction de Branch na thread {thread.id} em ROB ID {head_rob_entry.id} (Inst: {inst_obj})!")
+        self.mispredictions += 1
+        thread.mispredictions += 1
+
+        if head_rob_entry.actual_taken == PREDICT_TAKEN:
+            thread.program_counter = inst_obj.address
+        else:
+            thread.program_counter = head_rob_entry.program_order_index + 1
+        self.dirty_all = True
+
+        younger_ids = list(thread.rob_ids)[1:]
+        all_rob_ids_to_flush = set(younger_ids)
+        all_rob_ids_to_flush.add(head_rob_entry.id)
+
+        for reg_name, reg_obj in thread.register_file.items():
+            if reg_name == 'R0':
+                reg_obj.value = 0
+                reg_obj.clear()
+                continue
+            if reg_obj.busy and (reg_obj.reorder_tag is None or reg_obj.reorder_tag in all_rob_ids_to_flush):
+                reg_obj.clear()
+
+        for rs in self.reservation_stations:
+            if rs.busy and rs.destination_rob_id in all_rob_ids_to_flush:
+                rs.clear()
+
+        for rob_id in younger_ids:
+            self.reorder_buffer[rob_id].clear()
+            self._release_rob_entry(rob_id)
+        thread.rob_ids = collections.deque([head_rob_entry.id])
+        self.bubble_cycles += 1
+
+    # --- Estado e metricas ---
+    def is_finished(self):
+        all_issued = all(thread.program_counter >= thread.program_length for thread in self.threads)
+        return all_issued and self.current_rob_entries == 0
+
+    def get_metrics(self):
+        total_cycles = self.current_cycle
+        thread_metrics = []
+        for thread in self.threads:
+            thread_metrics.append({
+                "Committed Instructions": thread.committed_instructions_count,
+                "IPC": thread.committed_instructions_count / total_cycles if total_cycles > 0 else 0,
+                "Program Counter (PC)": thread.program_counter,
+                "Mispredictions": thread.mispredictions,
+            })
+        return {
+            "Total Cycles": total_cycles,
+            "Committed Instructions": self.committed_instructions_count,
+            "IPC": self.committed_instructions_count / total_cycles if total_cycles > 0 else 0,
+            "Bubble Cycles": self.bubble_cycles,
+            "Bypassed Operands": self.bypassed_operands,
+            "Threads": thread_metrics,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador Tomasulo com multithreading simultaneo (SMT)")
+    parser.add_argument("programs", nargs="+", help="um arquivo de instrucoes por thread")
+    parser.add_argument("--fetch-policy", choices=FETCH_POLICIES, default=FETCH_ROUND_ROBIN)
+    parser.add_argument("--rob-policy", choices=ROB_POLICIES, default=ROB_SHARED)
+    parser.add_argument("--rob-size", type=int, default=8)
+    parser.add_argument("--mem-rs", type=int, default=2)
+    parser.add_argument("--add-rs", type=int, default=3)
+    parser.add_argument("--logic-rs", type=int, default=2)
+    parser.add_argument("--mult-rs", type=int, default=1)
+    parser.add_argument("--bypass-issue", action="store_true")
+    parser.add_argument("--bypass-wakeup", action="store_true")
+    parser.add_argument("--max-cycles", type=int)
+    parser.add_argument("--state", help=f"arquivo de estado inicial (padrao {DEFAULT_STATE_FILE})")
+    args = parser.parse_args()
+
+    simulator = SMTTomasuloSimulator(
+        num_threads=len(args.programs), fetch_policy=args.fetch_policy, rob_policy=args.rob_policy,
+        num_mem_rs=args.mem_rs, num_add_rs=args.add_rs, num_logic_rs=args.logic_rs,
+        num_mult_rs=args.mult_rs, rob_size=args.rob_size,
+        bypass_issue=args.bypass_issue, bypass_wakeup=args.bypass_wakeup,
+    )
+    try:
+        simulator.set_initial_state(args.state or create_default_state_file())
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    simulator.load_program_files(args.programs)
+    metrics = simulator.run(args.max_cycles)
+
+    print(f"Total Cycles: {metrics['Total Cycles']}")
+    print(f"Bubble Cycles: {metrics['Bubble Cycles']}")
+    for i, (filename, thread_metrics) in enumerate(zip(args.programs, metrics["Threads"])):
+        print(f"Thread {i} ({filename}): {thread_metrics['Committed Instructions']} instrucoes, "
+              f"IPC {thread_metrics['IPC']:.2f}, mispredictions {thread_metrics['Mispredictions']}")
+    print(f"IPC agregado: {metrics['IPC']:.2f}")
+    if not simulator.is_finished():
+        print(f"Simulacao interrompida apos {simulator.current_cycle} ciclos (--max-cycles).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import bisect
+import hashlib
+import mmap
+import os
+from array import array
+
+# Imagens de estado inicial da maquina (registradores e memoria).
+# Um arquivo de estado e texto, uma diretiva por linha ('#' inicia comentario):
+#   REG R1 5                  valor inicial de um registrador
+#   MEM 108 5                 valor inicial de um endereco de memoria
+#   REGION 4096 dados.bin     regiao de memoria a partir do endereco 4096
+#   REGION 8192 tabela.txt 4  idem, com passo de 4 enderecos entre elementos
+# Uma regiao .bin e um vetor de inteiros de 64 bits na ordem de bytes nativa
+# (o que numpy.ndarray.astype(np.int64).tofile gera) e e mapeada em memoria
+# sem copia: o elemento i fica no endereco base + i * passo e so e lido
+# quando acessado, entao arquivos de varios megabytes carregam em
+# milissegundos. Regioes com outra extensao sao texto, um inteiro por
+# linha. Caminhos relativos sao resolvidos a partir do arquivo de estado.
+# As escritas do programa nunca alteram a imagem: ficam na memoria do
+# simulador (SimulatorMemory), que sobrepoe os valores das regioes.
+
+DEFAULT_STATE_FILE = "initial_state.txt"
+
+# Intervalo de um elemento de regiao (inteiro de 64 bits com sinal)
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+# Estado carregado pela GUI original (antes fixo em load_initial_program)
+DEFAULT_STATE = """# Estado inicial da maquina (registradores e memoria)
+REG R0 0
+REG R1 5
+REG R2 5
+MEM 108 5
+MEM 16 0
+MEM 12 7
+"""
+
+
+# --- Classe MemoryRegion ---
+class MemoryRegion:
+    def __init__(self, base, path, stride=1):
+        if stride < 1:
+            raise ValueError(f"Passo invalido para a regiao '{path}': {stride}")
+        self.base = base
+        self.path = path
+        self.stride = stride
+        self._mmap = None
+        self._digest = None
+        if path.endswith(".bin"):
+            with open(path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size % 8:
+                    raise ValueError(f"Regiao '{path}' tem {size} bytes, que nao e multiplo de 8.")
+                if size:
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.values = memoryview(self._mmap).cast('q') if self._mmap is not None else array('q')
+        else:
+            self.values = self._read_text(path)
+        self.length = len(self.values)
+        self.end = base + self.length * stride
+
+    @staticmethod
+    def _read_text(path):
+        values = array('q')
+        with open(path, 'r') as f:
+            for number, line in enumerate(f, 1):
+                text = line.split('#')[0].strip()
+                if not text:
+                    continue
+                try:
+                    value = int(text)
+                except ValueError:
+                    raise ValueError(f"Regiao '{path}', linha {number}: valor invalido '{text}'") from None
+                if not INT64_MIN <= value <= INT64_MAX:
+                    raise ValueError(f"Regiao '{path}', linha {number}: {value} nao cabe em 64 bits")
+                values.append(value)
+        return values
+
+    # Libera o mapeamento do arquivo (.bin); a regiao nao pode mais ser lida
+    def close(self):
+        if self._mmap is not None:
+            self.values.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Valor do endereco, ou None se ele nao pertence a regiao
+    def get(self, address):
+        offset = address - self.base
+        if offset < 0 or address >= self.end or offset % self.stride:
+            return None
+        return self.values[offset // self.stride]
+
+    # Hash do conteudo (calculado uma vez; usado pela chave do cache de resultados)
+    def digest(self):
+        if self._digest is None:
+            self._digest = hashlib.sha256(memoryview(self.values).cast('B')).hexdigest()
+        return self._digest
+
+    def describe(self):
+        return [self.base, self.stride, self.length, self.digest()]
+
+
+# --- Classe SimulatorMemory ---
+# Memoria do simulador: dicionario endereco -> valor com as escritas (e os MEM
+# da imagem) sobre as regioes somente leitura. Enderecos ausentes valem o
+# conteudo da regiao ou 0, como o defaultdict(int) usado antes.
+class SimulatorMemory(dict):
+    def __init__(self, regions=()):
+        super().__init__()
+        self.regions = sorted(regions, key=lambda region: region.base)
+        self._bases = [region.base for region in self.regions]
+        for previous, region in zip(self.regions, self.regions[1:]):
+            if region.base < previous.end:
+                raise ValueError(f"Regioes '{previous.path}' e '{region.path}' se sobrepoem.")
+
+    # Valor da regiao que contem o endereco, ou None
+    def _region_value(self, address):
+        if not self._bases:
+            return None
+        i = bisect.bisect_right(self._bases, address) - 1
+        return self.regions[i].get(address) if i >= 0 else None
+
+    # Valor da imagem (sem as escritas) no endereco
+    def image_value(self, address):
+        value = self._region_value(address)
+        return 0 if value is None else value
+
+    def __missing__(self, address):
+        return self.image_value(address)
+
+    def get(self, address, default=0):
+        value = dict.get(self, address, self)
+        if value is not self:
+            return value
+        value = self._region_value(address)
+        return default if value is None else value
+
+    # Enderecos cujo valor difere da imagem (estado minimo para reconstruir a memoria)
+    def changed_items(self):
+        return [(addr, value) for addr, value in self.items() if value != self.image_value(addr)]
+
+    def describe_regions(self):
+        return [region.describe() for region in self.regions]
+
+
+# --- Classe InitialState ---
+class InitialState:
+    def __init__(self, registers=None, memory=None, regions=None, filename=None):
+        self.registers = dict(registers or {})
+        self.memory = dict(memory or {})
+        self.regions = list(regions or [])
+        # Arquivo de origem (None se montado em memoria); permite recarregar a imagem
+        self.filename = filename
+        # Valida a sobreposicao ja na carga
+        SimulatorMemory(self.regions)
+
+    # allowed_dir: se informado, so regioes dentro dele podem ser abertas
+    @classmethod
+    def load(cls, filename, allowed_dir=None):
+        with open(filename, 'r') as f:
+            state = cls.parse(f.readlines(), os.path.dirname(os.path.abspath(filename)), allowed_dir)
+        state.filename = filename
+        return state
+
+    @classmethod
+    def parse(cls, lines, base_dir=".", allowed_dir=None):
+        registers, memory, regions = {}, {}, []
+        # Em caso de erro, fecha as regioes ja abertas
+        try:
+            for number, line in enumerate(lines, 1):
+                parts = line.split('#')[0].split()
+                if not parts:
+                    continue
+                directive = parts[0].upper()
+                try:
+                    if directive == "REG" and len(parts) == 3:
+                        registers[parts[1].upper()] = int(parts[2], 0)
+                    elif directive == "MEM" and len(parts) == 3:
+                        memory[int(parts[1], 0)] = int(parts[2], 0)
+                    elif directive == "REGION" and len(parts) in (3, 4):
+                        stride = int(parts[3], 0) if len(parts) == 4 else 1
+                        path = os.path.join(base_dir, parts[2])
+                        if allowed_dir is not None and not inside_directory(path, allowed_dir):
+                            raise ValueError(f"regiao fora de '{allowed_dir}': {parts[2]}")
+                        regions.append(MemoryRegion(int(parts[1], 0), path, stride))
+                    else:
+                        raise ValueError(f"diretiva invalida '{line.strip()}'")
+                except ValueError as e:
+                    raise ValueError(f"Estado inicial, linha {number}: {e}") from None
+            return cls(registers, memory, regions)
+        except (OSError, ValueError):
+            for region in regions:
+                region.close()
+            raise
+
+    # Fecha as regioes mapeadas; memorias construidas a partir da imagem deixam de valer
+    def close(self):
+        for region in self.regions:
+            region.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Memoria nova com as regioes e os valores MEM da imagem
+    def build_memory(self):
+        memory = SimulatorMemory(self.regions)
+        memory.update(self.memory)
+        return memory
+
+
+def inside_directory(path, directory):
+    path, directory = os.path.realpath(path), os.path.realpath(directory)
+    return os.path.commonpath([path, directory]) == directory
+
+
+# Aceita um InitialState ou o caminho de um arquivo de estado
+def load_state(state):
+    if state is None or isinstance(state, InitialState):
+        return state
+    return InitialState.load(state)
+
+
+# Cria o arquivo de estado padrao se ele nao existir (como instructions.txt na GUI)
+# e retorna o seu nome
+def create_default_state_file(filename=DEFAULT_STATE_FILE):
+    if os.path.exists(filename) and os.path.getsize(filename) > 0:
+        return filename
+    print(f"Arquivo '{filename}' nao encontrado ou vazio. Criando com o estado inicial padrao.")
+    with open(filename, "w") as f:
+        f.write(DEFAULT_STATE)
+    return filename
@@ -0,0 +1,144 @@
+import csv
+import json
+
+import numpy as np
+
+from tomasulo_sim import UNIT_CLASSES, UNIT_OF_OPCODE
+
+# Relatorios de latencia por instrucao a partir do RetireLog de um
+# TomasuloSimulator (simulator.enable_retire_log() antes de executar).
+# Para cada instrucao confirmada sao derivados quatro intervalos, em ciclos:
+#   issue_wait       emissao -> inicio da execucao (espera por operandos/UF)
+#   execute_latency  inicio -> fim da execucao (inclusive)
+#   cdb_wait         fim da execucao -> escrita no CDB
+#   rob_residency    emissao -> saida do ROB
+# e cada um e resumido (media, p50/p95/p99, maximo e histograma por ciclo)
+# para todas as instrucoes, por opcode e por classe de unidade funcional.
+
+TIMING_METRICS = [
+    ("issue_wait", "Espera emissao -> execucao"),
+    ("execute_latency", "Latencia de execucao"),
+    ("cdb_wait", "Espera pelo CDB"),
+    ("rob_residency", "Permanencia no ROB"),
+]
+PERCENTILES = (50, 95, 99)
+HISTOGRAM_TEXT_BINS = 16
+
+
+# Colunas do RetireLog como arrays NumPy (sem copia)
+def retire_arrays(retire_log):
+    return {name: np.frombuffer(column, dtype=np.int64, count=retire_log.count)
+            for name, column in retire_log.columns.items()}
+
+
+def timing_intervals(columns):
+    return {
+        "issue_wait": columns["execute_start_cycle"] - columns["issue_cycle"],
+        "execute_latency": columns["complete_cycle"] - columns["execute_start_cycle"] + 1,
+        "cdb_wait": columns["write_result_cycle"] - columns["complete_cycle"],
+        "rob_residency": columns["retire_cycle"] - columns["issue_cycle"],
+    }
+
+
+def summarize(values):
+    if len(values) == 0:
+        return {"count": 0}
+    # Percentis pelo valor observado imediatamente acima (ciclos inteiros, conservador na cauda)
+    p50, p95, p99 = np.percentile(values, PERCENTILES, method="higher")
+    low = int(values.min())
+    return {
+        "count": int(len(values)),
+        "mean": float(values.mean()),
+        "p50": int(p50),
+        "p95": int(p95),
+        "p99": int(p99),
+        "max": int(values.max()),
+        # histogram[i] = quantidade de instrucoes com valor histogram_start + i
+        "histogram_start": low,
+        "histogram": np.bincount(values - low).tolist(),
+    }
+
+
+# Relatorio completo: {"Todas": {...}, "Opcode": {op: {...}}, "Unidade": {classe: {...}}},
+# cada folha com um resumo por metrica de TIMING_METRICS
+def timing_report(simulator):
+    log = simulator.retire_log
+    if log is None:
+        raise ValueError("Registro de latencias desligado; chame simulator.enable_retire_log() antes de executar.")
+
+    columns = retire_arrays(log)
+    intervals = timing_intervals(columns)
+    program_opnames = [inst.opname for inst in simulator.program_instructions]
+    opcode_names = sorted(set(program_opnames))
+    opcode_index = {op: i for i, op in enumerate(opcode_names)}
+    opcode_of_static = np.array([opcode_index[op] for op in program_opnames], dtype=np.int64)
+    unit_of_opcode = np.array([UNIT_OF_OPCODE[op] for op in opcode_names], dtype=np.int64)
+
+    opcode = opcode_of_static[columns["static_index"]] if len(program_opnames) else columns["static_index"]
+    unit = unit_of_opcode[opcode] if len(opcode_names) else opcode
+
+    def group(mask):
+        return {name: summarize(intervals[name][mask]) for name, _ in TIMING_METRICS}
+
+    report = {"Todas": group(slice(None)), "Opcode": {}, "Unidade": {}}
+    for i, op in enumerate(opcode_names):
+        mask = opcode == i
+        if mask.any():
+            report["Opcode"][op] = group(mask)
+    for i, unit_class in enumerate(UNIT_CLASSES):
+        mask = unit == i
+        if mask.any():
+            report["Unidade"][unit_class] = group(mask)
+    return report
+
+
+def _report_rows(report):
+    yield "Todas", "", report["Todas"]
+    for kind in ("Opcode", "Unidade"):
+        for name, metrics in report[kind].items():
+            yield kind, name, metrics
+
+
+# Histograma compacto: so os valores observados, no maximo HISTOGRAM_TEXT_BINS pares
+def format_histogram(summary):
+    if summary["count"] == 0:
+        return "-"
+    start = summary["histogram_start"]
+    pairs = [f"{start + i}:{n}" for i, n in enumerate(summary["histogram"]) if n]
+    if len(pairs) > HISTOGRAM_TEXT_BINS:
+        pairs = pairs[:HISTOGRAM_TEXT_BINS] + ["..."]
+    return " ".join(pairs)
+
+
+def format_report(report):
+    lines = []
+    for metric, title in TIMING_METRICS:
+        lines.append(f"{title} (ciclos)")
+        lines.append(f"  {'grupo':<14}{'n':>9}{'media':>9}{'p50':>7}{'p95':>7}{'p99':>7}{'max':>7}")
+        for kind, name, metrics in _report_rows(report):
+            summary = metrics[metric]
+            label = {"Todas": kind, "Opcode": name, "Unidade": f"UF {name}"}[kind]
+            if summary["count"] == 0:
+                lines.append(f"  {label:<14}{0:>9}")
+                continue
+            lines.append(f"  {label:<14}{summary['count']:>9}{summary['mean']:>9.2f}{summary['p50']:>7}"
+                         f"{summary['p95']:>7}{summary['p99']:>7}{summary['max']:>7}")
+        lines.append("  histograma (ciclos:n): " + format_histogram(report["Todas"][metric]))
+        lines.append("")
+    return "\n".join(lines)
+
+
+# Salva o relatorio em JSON (completo, com histogramas) ou CSV (so os resumos)
+def export_report(report, path):
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["grupo", "nome", "metrica", "n", "media", "p50", "p95", "p99", "max"])
+            for kind, name, metrics in _report_rows(report):
+                for metric, _ in TIMING_METRICS:
+                    summary = metrics[metric]
+                    writer.writerow([kind, name, metric, summary["count"], summary.get("mean"),
+                                     summary.get("p50"), summary.get("p95"), summary.get("p99"), summary.get("max")])
+    else:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)